@@ -4,6 +4,11 @@ from typing import List, Dict
 # STRATEGY PATTERN FOR MODELS
 # ==========================================================
 class AnnotatorStrategy(ABC):
+    # Identity used by the annotation cache: which model and which prompt /
+    # hypothesis wording produced a result. Subclasses override these.
+    model_id: str = ""
+    prompt_version: str = ""
+
     @abstractmethod
     def classify_batch(self, chunks: List[str]) -> List[Dict]:
-        pass
\ No newline at end of file
+        pass
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Callable, List, Dict, Optional, Union
+
+from annotators.base import AnnotatorStrategy
+from config.labels import LABELS
+
+# --------------------------------------------------------------
+#  On-disk annotation store – SQLite, size-bounded LRU
+# --------------------------------------------------------------
+class AnnotationCache:
+    """
+    Content-addressed store of classification results.
+    Keys are hashes (see `make_key`), values are the result dicts as JSON.
+    When the table grows past `max_entries`, the least recently used rows
+    are evicted.
+    """
+
+    def __init__(self, db_path: Path, max_entries: int = 200_000):
+        self.db_path = Path(db_path).expanduser()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max(1, max_entries)
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS annotations ("
+            " key TEXT PRIMARY KEY,"
+            " result TEXT NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_annotations_last_used ON annotations(last_used)"
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(text: str, model_id: str, prompt_version: str, labels: List[str]) -> str:
+        # Whitespace-insensitive, like AnnotationCheckpoint.sentence_hash, so a
+        # sentence re-extracted with other line breaks still hits
+        payload = json.dumps([" ".join(text.split()), model_id, prompt_version, list(labels)], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dict]:
+        """Returns {key: result} for every key present, and touches them for LRU."""
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        # Stay below SQLite's default bound-parameter limit
+        for start in range(0, len(unique), 500):
+            part = unique[start:start + 500]
+            marks = ",".join("?" * len(part))
+            rows = self.conn.execute(
+                f"SELECT key, result FROM annotations WHERE key IN ({marks})", part
+            ).fetchall()
+            found.update((key, json.loads(result)) for key, result in rows)
+        if found:
+            now = time.time()
+            self.conn.executemany(
+                "UPDATE annotations SET last_used = ? WHERE key = ?",
+                [(now, key) for key in found],
+            )
+            self.conn.commit()
+        return found
+
+    def put_many(self, items: Dict[str, Dict]):
+        if not items:
+            return
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO annotations (key, result, last_used) VALUES (?, ?, ?)",
+            [(key, json.dumps(result, ensure_ascii=False), now) for key, result in items.items()],
+        )
+        self._evict()
+        self.conn.commit()
+
+    def _evict(self):
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM annotations").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM annotations WHERE key IN ("
+                " SELECT key FROM annotations ORDER BY last_used ASC LIMIT ?)",
+                (excess,),
+            )
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM annotations").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+# --------------------------------------------------------------
+#  Strategy wrapper – only cache misses reach the model
+# --------------------------------------------------------------
+class CachedAnnotator(AnnotatorStrategy):
+    """
+    Wraps any AnnotatorStrategy and serves repeated sentences from disk.
+
+    `strategy` may also be a zero-argument factory; the model is then only
+    built on the first cache miss, so a fully warm re-run never loads it.
+    Identity must be given explicitly in that case.
+    """
+
+    def __init__(self, strategy: Union[AnnotatorStrategy, Callable[[], AnnotatorStrategy]],
+                 cache: AnnotationCache, model_id: Optional[str] = None,
+                 prompt_version: Optional[str] = None, labels: Optional[List[str]] = None):
+        if isinstance(strategy, AnnotatorStrategy):
+            self._strategy, self._factory = strategy, None
+            model_id = model_id or strategy.model_id or type(strategy).__name__
+            prompt_version = strategy.prompt_version if prompt_version is None else prompt_version
+        else:
+            if model_id is None or prompt_version is None:
+                raise ValueError("A strategy factory needs an explicit model_id and prompt_version.")
+            self._strategy, self._factory = None, strategy
+        self.cache = cache
+        self.labels = labels if labels is not None else LABELS
+        self.model_id = model_id
+        self.prompt_version = prompt_version
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def strategy(self) -> AnnotatorStrategy:
+        if self._strategy is None:
+            self._strategy = self._factory()
+        return self._strategy
+
+    def _key(self, text: str) -> str:
+        return AnnotationCache.make_key(text, self.model_id, self.prompt_version, self.labels)
+
+    def lookup(self, chunks: List[str]) -> List[Optional[Dict]]:
+        """Cached result per sentence, or None. Never touches the model."""
+        keys = [self._key(text) for text in chunks]
+        cached = self.cache.get_many(keys)
+        self.hits += sum(key in cached for key in keys)
+        return [cached.get(key) for key in keys]
+
+    def classify_batch(self, chunks: List[str]) -> List[Dict]:
+        if not chunks:
+            return []
+
+        keys = [self._key(text) for text in chunks]
+        cached = self.cache.get_many(keys)
+
+        miss_idx = [i for i, key in enumerate(keys) if key not in cached]
+        self.hits += len(chunks) - len(miss_idx)
+        self.misses += len(miss_idx)
+
+        results: List[Optional[Dict]] = [cached.get(key) for key in keys]
+        if miss_idx:
+            fresh = self.strategy.classify_batch([chunks[i] for i in miss_idx])
+            for i, result in zip(miss_idx, fresh):
+                results[i] = result
+            self.store([chunks[i] for i in miss_idx][:len(fresh)], fresh)
+
+        # Strategy returned too few results – fill the gaps, never cache them
+        return [
+            r if r is not None else {"category": "none", "justification": "Error: missing result."}
+            for r in results
+        ]
+
+    def store(self, chunks: List[str], results: List[Dict]):
+        """Persists results produced outside `classify_batch` (e.g. multi-sequence runs)."""
+        self.cache.put_many({
+            self._key(text): result
+            for text, result in zip(chunks, results)
+            # Never persist error fallbacks, they should be retried next run
+            if not str(result.get("justification", "")).startswith("Error:")
+        })
+
+    def report(self) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return f"cache hits {self.hits}/{total} ({rate:.0%}), {len(self.cache)} entries on disk"
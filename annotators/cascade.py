@@ -0,0 +1,81 @@
+from typing import List, Dict
+
+from annotators.base import AnnotatorStrategy
+
+# --------------------------------------------------------------
+#  Confidence-gated cascade – cheap classifier first, LLM on doubt
+# --------------------------------------------------------------
+class CascadeStrategy(AnnotatorStrategy):
+    """
+    Runs a cheap classifier (e.g. ZeroShotSentence) over every sentence and
+    escalates to an expensive one (e.g. Phi3ONNXStrategy) only the sentences
+    whose top score is below `min_confidence` or whose margin over the
+    runner-up label is below `min_margin`.
+
+    Escalated sentences are sent in document order, grouped into runs that
+    are at most `max_gap` sentences apart and `max_batch` long, so the LLM
+    still sees neighbouring context. Every result gets a "tier" key
+    ("cheap" or "llm") recording which model produced it.
+    """
+
+    def __init__(self, cheap: AnnotatorStrategy, expensive: AnnotatorStrategy,
+                 min_confidence: float = 0.6, min_margin: float = 0.15,
+                 max_batch: int = 16, max_gap: int = 2):
+        self.cheap = cheap
+        self.expensive = expensive
+        self.min_confidence = min_confidence
+        self.min_margin = min_margin
+        self.max_batch = max(1, max_batch)
+        self.max_gap = max(0, max_gap)
+        self.model_id = f"cascade({cheap.model_id}|{expensive.model_id})"
+        self.prompt_version = (
+            f"{cheap.prompt_version}|{expensive.prompt_version}|{min_confidence}|{min_margin}"
+        )
+        self.stats = {"sentences": 0, "escalated": 0, "llm_calls": 0, "llm_failed": 0}
+
+    def _is_uncertain(self, result: Dict) -> bool:
+        confidence = result.get("confidence", 0.0)
+        margin = result.get("margin", float("inf"))
+        return confidence < self.min_confidence or margin < self.min_margin
+
+    def _group(self, indices: List[int]) -> List[List[int]]:
+        """Splits sorted indices into close-together runs of at most `max_batch`."""
+        groups: List[List[int]] = []
+        for i in indices:
+            if groups and len(groups[-1]) < self.max_batch and i - groups[-1][-1] <= self.max_gap + 1:
+                groups[-1].append(i)
+            else:
+                groups.append([i])
+        return groups
+
+    def classify_batch(self, chunks: List[str]) -> List[Dict]:
+        """
+        Pass the whole document (or a large slice of it) at once so
+        escalated sentences can be grouped with their neighbours.
+        """
+        if not chunks:
+            return []
+
+        results = [{**r, "tier": "cheap"} for r in self.cheap.classify_batch(chunks)]
+        escalate = [i for i, r in enumerate(results) if self._is_uncertain(r)]
+        self.stats["sentences"] += len(chunks)
+        self.stats["escalated"] += len(escalate)
+
+        for group in self._group(escalate):
+            self.stats["llm_calls"] += 1
+            llm_results = self.expensive.classify_batch([chunks[i] for i in group])
+            for i, llm_result in zip(group, llm_results):
+                # An LLM fallback is worse than the cheap guess, keep the latter
+                if str(llm_result.get("justification", "")).startswith("Error:"):
+                    self.stats["llm_failed"] += 1
+                    continue
+                results[i] = {**llm_result, "tier": "llm", "cheap_category": results[i]["category"]}
+        return results
+
+    def report(self) -> str:
+        st = self.stats
+        share = st["escalated"] / st["sentences"] if st["sentences"] else 0.0
+        return (
+            f"{st['escalated']}/{st['sentences']} sentences escalated to the LLM ({share:.0%}) "
+            f"in {st['llm_calls']} calls, {st['llm_failed']} kept the cheap label after an LLM failure"
+        )
@@ -0,0 +1,129 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import List, Dict, Optional
+
+import numpy as np
+
+from annotators.base import AnnotatorStrategy
+from config.labels import LABEL_DESCRIPTIONS
+from utils.instrumentation import TRACER
+
+DEFAULT_PROTOTYPE_CACHE = Path("~/.cache/auto-paper-annotator/prototypes")
+
+
+class EmbeddingPrototypeStrategy(AnnotatorStrategy):
+    """
+    Sentence-embedding classifier: one encoder pass per sentence, then a
+    single matrix multiply against per-label prototype embeddings built from
+    `LABEL_DESCRIPTIONS` (plus optional seed sentences per label).
+    Returns the same dict shape as ZeroShotSentence, including `confidence`.
+    """
+
+    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+                 seed_examples: Optional[Dict[str, List[str]]] = None,
+                 cache_dir: Optional[Path] = DEFAULT_PROTOTYPE_CACHE,
+                 batch_size: int = 64, temperature: float = 0.05):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+        print(f"[INFO] Loading sentence-embedding model: {model_name} ...")
+        self.model_id = model_name
+        self.seed_examples = seed_examples or {}
+        self.prompt_version = self.source_version(self.seed_examples)
+        self.batch_size = max(1, batch_size)
+        self.temperature = temperature
+        self.device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
+        with TRACER.stage("embedding.load"):
+            self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+            self.model = AutoModel.from_pretrained(model_name)
+            self.model.to(self.device).eval()
+
+        self.labels = list(LABEL_DESCRIPTIONS)
+        self.prototypes = self._load_prototypes(cache_dir)
+        print(f"[INFO] Model loaded on {self.device}.")
+
+    @staticmethod
+    def source_version(seed_examples: Optional[Dict[str, List[str]]] = None) -> str:
+        """Hash of everything the prototypes are built from (model name aside)."""
+        payload = json.dumps([LABEL_DESCRIPTIONS, seed_examples or {}], sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+    # ------------------------------------------------------------------ #
+    # PRIVATE – encoder and prototypes
+    # ------------------------------------------------------------------ #
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        """L2-normalised mean-pooled embeddings, batched in length order."""
+        import torch
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        out = np.empty((len(texts), self.model.config.hidden_size), dtype=np.float32)
+        for start in range(0, len(order), self.batch_size):
+            idx = order[start:start + self.batch_size]
+            inputs = self.tokenizer(
+                [texts[i] for i in idx],
+                padding=True,
+                truncation=True,
+                return_tensors="pt",
+            ).to(self.device)
+            with TRACER.stage("embedding.forward", sentences=len(idx)), torch.inference_mode():
+                hidden = self.model(**inputs).last_hidden_state
+            mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+            pooled = torch.nn.functional.normalize(pooled, dim=-1)
+            out[idx] = pooled.float().cpu().numpy()
+        return out
+
+    def _build_prototypes(self) -> np.ndarray:
+        rows = []
+        for label in self.labels:
+            texts = [f"{label.replace('_', ' ')}: {LABEL_DESCRIPTIONS[label]}"]
+            texts += self.seed_examples.get(label, [])
+            centroid = self._embed(texts).mean(axis=0)
+            rows.append(centroid / np.linalg.norm(centroid))
+        return np.stack(rows).astype(np.float32)
+
+    def _load_prototypes(self, cache_dir: Optional[Path]) -> np.ndarray:
+        """Prototype matrix (num_labels, dim), cached on disk per model + sources."""
+        if cache_dir is None:
+            return self._build_prototypes()
+        key = hashlib.sha1(f"{self.model_id}|{self.prompt_version}".encode("utf-8")).hexdigest()[:16]
+        path = Path(cache_dir).expanduser() / f"{key}.npy"
+        if path.exists():
+            return np.load(path)
+        prototypes = self._build_prototypes()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.save(path, prototypes)
+        return prototypes
+
+    # ------------------------------------------------------------------ #
+    # PUBLIC – batch interface required by AnnotatorStrategy
+    # ------------------------------------------------------------------ #
+    def classify_batch(self, chunks: List[str]) -> List[Dict]:
+        """
+        `chunks` → list of *individual* sentences. Pass the whole document at
+        once: scoring is one (num_sentences × num_labels) matrix multiply.
+        """
+        if not chunks:
+            return []
+
+        with TRACER.stage("embedding.classify", sentences=len(chunks)):
+            sims = self._embed(chunks) @ self.prototypes.T
+        logits = sims / self.temperature
+        probs = np.exp(logits - logits.max(axis=1, keepdims=True))
+        probs /= probs.sum(axis=1, keepdims=True)
+
+        ranked = np.argsort(probs, axis=1)
+        top, second = ranked[:, -1], ranked[:, -2]
+        rows = np.arange(len(chunks))
+        top_scores, second_scores = probs[rows, top], probs[rows, second]
+
+        annotations = []
+        for text, label_idx, score, runner_up in zip(chunks, top, top_scores, second_scores):
+            category_key = self.labels[label_idx]
+            annotations.append({
+                "category": category_key,
+                "confidence": float(score),
+                "margin": float(score - runner_up),
+                "evidence": [text],
+                "justification": f"Closest to the '{category_key}' prototype with {score:.2f} confidence."
+            })
+        return annotations
@@ -0,0 +1,38 @@
+from pathlib import Path
+from typing import Optional
+
+from annotators.base import AnnotatorStrategy
+from annotators.cache import AnnotationCache, CachedAnnotator
+
+# --------------------------------------------------------------
+#  Strategy construction shared by the corpus and server CLIs
+# --------------------------------------------------------------
+BACKENDS = ("nli", "embedding", "llm")
+
+
+def build_strategy(backend: str, onnx_folder: Optional[Path] = None, output_format: str = "codes",
+                   model: Optional[str] = None, cache: Optional[Path] = None,
+                   cache_size: int = 200_000) -> AnnotatorStrategy:
+    """
+    Loads one backend's strategy, wrapped in a CachedAnnotator when `cache`
+    is given. `onnx_folder` and `output_format` are for the LLM backend,
+    `model` overrides the Hugging Face model of the others.
+    Raises ValueError for an unknown backend or an LLM without `onnx_folder`.
+    """
+    if backend == "llm":
+        if onnx_folder is None:
+            raise ValueError("The llm backend needs an ONNX model folder.")
+        from annotators.llm_annotator import Phi3ONNXStrategy
+        strategy = Phi3ONNXStrategy(Path(onnx_folder).expanduser().resolve(), output_format=output_format)
+    elif backend == "embedding":
+        from annotators.embedding_annotator import EmbeddingPrototypeStrategy
+        strategy = EmbeddingPrototypeStrategy(model or "sentence-transformers/all-MiniLM-L6-v2")
+    elif backend == "nli":
+        from annotators.nli_annotator import ZeroShotSentence
+        strategy = ZeroShotSentence(model_name=model or "MoritzLaurer/DeBERTa-v3-base-mnli-fever-anli")
+    else:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}.")
+
+    if cache:
+        strategy = CachedAnnotator(strategy, AnnotationCache(cache, cache_size))
+    return strategy
@@ -1,13 +1,72 @@
 import json
 import re
+import time
+from pathlib import Path
 from annotators.base import AnnotatorStrategy
-from config.prompts import BATCH_PROMPT_TEMPLATE
-import fitz  # PyMuPDF
-from typing import List, Dict
+from config.labels import LABEL_CODES
+from config.prompts import (
+    BATCH_PROMPT_TEMPLATE,
+    COMPACT_PROMPT_TEMPLATE,
+    JUSTIFICATION_PROMPT_TEMPLATE,
+    PROMPT_VERSIONS,
+    SENTENCES_MARKER,
+)
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Sequence, Tuple
+from utils.batching import pack_by_token_budget
+from utils.instrumentation import TRACER
+from utils.stream_parse import JSONArrayStreamParser, LabelCodeStreamParser
+
+# onnxruntime-genai is imported when a strategy is built, so importing this
+# module (e.g. for `--help`) stays cheap
+
+VALID_CATEGORIES = set(LABEL_CODES.values())
+
+# Phi-3 chat format for one user turn plus the generation prompt, used when the
+# model folder has no tokenizer_config.json chat template (or jinja2 is missing)
+PHI3_CHAT_TEMPLATE = "<|user|>\n{content}<|end|>\n<|assistant|>\n"
+
+
+def load_chat_template(model_folder: str) -> Callable[[str], str]:
+    """
+    Returns prompt → chat-formatted text, built from files in the local
+    model folder only (no Hub lookup, no transformers).
+
+    The `chat_template` of tokenizer_config.json is rendered with jinja2
+    when both exist; otherwise PHI3_CHAT_TEMPLATE is used. BOS is left out
+    of the rendered text because the ONNX tokenizer adds it when encoding.
+    """
+    config_path = Path(model_folder) / "tokenizer_config.json"
+    try:
+        with open(config_path, encoding="utf-8") as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        config = {}
+    source = config.get("chat_template")
+    if isinstance(source, list):   # named templates: [{"name": "default", "template": ...}, ...]
+        source = next((t["template"] for t in source if t.get("name") == "default"), None)
+    if source:
+        try:
+            from jinja2.sandbox import ImmutableSandboxedEnvironment
+        except ImportError:
+            print("[WARN] jinja2 not installed; using the built-in Phi-3 chat template.")
+        else:
+            def raise_exception(message):
+                raise ValueError(message)
+
+            env = ImmutableSandboxedEnvironment(trim_blocks=True, lstrip_blocks=True)
+            env.globals["raise_exception"] = raise_exception
+            compiled = env.from_string(source)
+            eos = config.get("eos_token") or ""
+            eos = eos.get("content", "") if isinstance(eos, dict) else eos
+            return lambda prompt: compiled.render(
+                messages=[{"role": "user", "content": prompt}],
+                add_generation_prompt=True,
+                bos_token="",
+                eos_token=eos,
+            )
+    return lambda prompt: PHI3_CHAT_TEMPLATE.format(content=prompt)
 
-# <-- NEW: Import ONNX and the HF tokenizer for chat templating
-import onnxruntime_genai as og
-from transformers import AutoTokenizer
 # --------------------------------------------------------------
 #  ONNX Phi-3 strategy – Processes a full batch in one LLM call
 # --------------------------------------------------------------
@@ -16,27 +75,131 @@ class Phi3ONNXStrategy(AnnotatorStrategy):
     Uses the ONNX Phi-3-mini-4k-instruct model via onnxruntime-genai.
     This version processes an entire batch of sentences in a single prompt
     to provide context to the model, improving label accuracy.
+
+    `output_format="codes"` asks only for one-letter label codes
+    ("1:M 2:R 3:N"), a few tokens per sentence; results then carry no
+    justification and `justify()` can fill them in on demand.
+    `output_format="json"` is the verbose per-sentence JSON with reasons.
     """
 
-    def __init__(self, onnx_folder: str):
+    CONTEXT_WINDOW = 4096          # Phi-3-mini-4k prompt + generation limit
+    OUTPUT_TOKENS_PER_SENTENCE = 80  # ~one JSON object with a short justification
+    OUTPUT_TOKENS_PER_CODE = 4       # "12:M " in the compact format
+    OUTPUT_BUFFER_TOKENS = 256     # brackets, whitespace, stray chatter
+    PROMPT_TOKENS_PER_SENTENCE = 6   # numbering, quotes and newline around each sentence
+
+    def __init__(self, onnx_folder: str, output_format: str = "codes", max_retry_depth: int = 2,
+                 reuse_prefix: bool = True):
+        if output_format not in PROMPT_VERSIONS:
+            raise ValueError(f"Unknown output format: {output_format!r}")
         print(f"[INFO] Loading Phi-3 ONNX model from {onnx_folder} ...")
-        self.model = og.Model(onnx_folder)
-        self.tokenizer = og.Tokenizer(self.model)
-        self.hf_tokenizer = AutoTokenizer.from_pretrained(
-            "microsoft/Phi-3-mini-4k-instruct"
-        )
+        self.output_format = output_format
+        self.model_id = str(onnx_folder)
+        self.prompt_version = PROMPT_VERSIONS[output_format]
+        import onnxruntime_genai as og
+        with TRACER.stage("llm.load"):
+            self.model = og.Model(onnx_folder)
+            self.tokenizer = og.Tokenizer(self.model)
+        self.chat_template = load_chat_template(onnx_folder)
+        self.last_output = ""   # raw text of the most recent generation, for error reports
+        self.max_retry_depth = max_retry_depth
+        self.stats = {
+            "batches": 0, "salvaged": 0, "retries": 0, "retried_sentences": 0, "fallbacks": 0,
+            "prefills": 0, "prefill_tokens": 0, "prefill_s": 0.0,
+        }
+
+        # ---- Static prompt prefix: encoded once, its KV state kept in a
+        # long-lived generator that is rewound after every batch.
+        self.reuse_prefix = reuse_prefix
+        self.can_rewind = hasattr(og.Generator, "rewind_to")
+        self._bos_ids = [int(t) for t in self.tokenizer.encode("")]
+        self._prefix_text, self._prefix_ids = self._encode_static_prefix()
+        if self.reuse_prefix and not self._prefix_split_is_exact():
+            print("[WARN] Tokenizer merges tokens across the prompt prefix; prefix reuse disabled.")
+            self.reuse_prefix = False
+        self._prefix_generator = None
+        self._eos_ids = self._read_eos_ids(onnx_folder)
         print("[INFO] ONNX model loaded.")
 
+    @staticmethod
+    def _read_eos_ids(onnx_folder: str) -> set:
+        """EOS token ids from genai_config.json, for per-sequence stop handling."""
+        try:
+            with open(Path(onnx_folder) / "genai_config.json", encoding="utf-8") as f:
+                eos = json.load(f)["model"]["eos_token_id"]
+        except (OSError, KeyError, ValueError):
+            return {32000, 32007}   # Phi-3: <|endoftext|>, <|end|>
+        return set(eos) if isinstance(eos, list) else {eos}
+
     def _build_batch_prompt(self, texts: List[str]) -> str:
         """Formats a list of sentences into a single, numbered prompt."""
         formatted_sentences = "\n".join(
             f"{i+1}. \"{s}\"" for i, s in enumerate(texts)
         )
-        return BATCH_PROMPT_TEMPLATE.format(
+        template = COMPACT_PROMPT_TEMPLATE if self.output_format == "codes" else BATCH_PROMPT_TEMPLATE
+        return template.format(
             num_sentences=len(texts),
             formatted_sentences=formatted_sentences
         )
 
+    def _encode(self, text: str, strip_bos: bool = False) -> List[int]:
+        ids = [int(t) for t in self.tokenizer.encode(text)]
+        if strip_bos and self._bos_ids and ids[:len(self._bos_ids)] == self._bos_ids:
+            ids = ids[len(self._bos_ids):]
+        return ids
+
+    def _encode_static_prefix(self) -> Tuple[str, List[int]]:
+        """Chat-wrapped instructions up to the sentence list; identical for every batch."""
+        rendered = self._apply_chat_template(self._build_batch_prompt(["..."]))
+        prefix_text = rendered[:rendered.index(SENTENCES_MARKER)]
+        return prefix_text, self._encode(prefix_text)
+
+    def _prefix_split_is_exact(self) -> bool:
+        """True when prefix ids + encoded suffix equal the encoding of the whole prompt, on a probe batch."""
+        probe = self._apply_chat_template(self._build_batch_prompt([
+            "We propose a new method for sentence classification.",
+            "Results improve over the baseline by 3.2 points.",
+        ]))
+        if not probe.startswith(self._prefix_text):
+            return True   # _prepare_input falls back to encoding the whole prompt anyway
+        suffix = probe[len(self._prefix_text):]
+        return self._prefix_ids + self._encode(suffix, strip_bos=True) == self._encode(probe)
+
+    def _apply_chat_template(self, prompt: str) -> str:
+        return self.chat_template(prompt)
+
+    def _output_tokens_per_sentence(self) -> int:
+        if self.output_format == "codes":
+            return self.OUTPUT_TOKENS_PER_CODE
+        return self.OUTPUT_TOKENS_PER_SENTENCE
+
+    def _expected_output_len(self, num_texts: int) -> int:
+        return num_texts * self._output_tokens_per_sentence() + self.OUTPUT_BUFFER_TOKENS
+
+    def plan_batches(self, texts: Sequence[str], pages: Optional[Sequence[int]] = None,
+                     token_budget: int = CONTEXT_WINDOW,
+                     max_sentences: Optional[int] = None) -> List[Tuple[int, int]]:
+        """
+        Splits `texts` into (start, end) ranges that each fit `token_budget`
+        tokens of prompt plus expected output. Every sentence is tokenized
+        once with the ONNX tokenizer; order and page adjacency are kept.
+        """
+        if not texts:
+            return []
+        token_budget = min(token_budget, self.CONTEXT_WINDOW)
+        empty_prompt = self._apply_chat_template(self._build_batch_prompt([]))
+        fixed_cost = len(self.tokenizer.encode(empty_prompt)) + self.OUTPUT_BUFFER_TOKENS
+        per_item_cost = self.PROMPT_TOKENS_PER_SENTENCE + self._output_tokens_per_sentence()
+        token_counts = [len(self.tokenizer.encode(t)) for t in texts]
+        return pack_by_token_budget(
+            token_counts,
+            pages if pages is not None else [0] * len(texts),
+            budget=token_budget,
+            fixed_cost=fixed_cost,
+            per_item_cost=per_item_cost,
+            max_items=max_sentences,
+        )
+
     def _generate_fallback_response(self, num_texts: int, error_msg: str) -> List[Dict]:
         """Creates a default 'none' response for a batch when parsing fails."""
         print(f"[ERROR] LLM response parsing failed: {error_msg}")
@@ -45,84 +208,436 @@ class Phi3ONNXStrategy(AnnotatorStrategy):
             for _ in range(num_texts)
         ]
 
+    def _prepare_input(self, chunks: List[str]) -> Tuple[List[int], int]:
+        """Builds and encodes the prompt; returns (input_ids, max_total_length)."""
+        prompt = self._build_batch_prompt(chunks)
+
+        # ---- Chat template from the model folder (same format the model expects)
+        input_text = self._apply_chat_template(prompt)
+
+        # ---- Encode with the ONNX tokenizer; the static prefix is already
+        # encoded, so only the batch-specific suffix is tokenized here.
+        if self.reuse_prefix and input_text.startswith(self._prefix_text):
+            suffix = input_text[len(self._prefix_text):]
+            input_ids = self._prefix_ids + self._encode(suffix, strip_bos=True)
+        else:
+            input_ids = self._encode(input_text)
+        input_len = len(input_ids)
+        TRACER.count("llm.prompt_tokens", input_len)
+
+        # ---- CRITICAL: Calculate max_length for a batch response.
+        # We need space for N answers (see plan_batches for packing).
+        expected_output_len = self._expected_output_len(len(chunks))
+        max_total_length = min(input_len + expected_output_len, self.CONTEXT_WINDOW)
+        return input_ids, max_total_length
+
+    def _new_generator(self, max_length: int):
+        import onnxruntime_genai as og
+        # ---- Generation parameters
+        params = og.GeneratorParams(self.model)
+        params.set_search_options(
+            max_length=max_length,
+            temperature=0.0,
+            do_sample=False,
+        )
+        return og.Generator(self.model, params)
+
+    def _prefill(self, generator, token_ids: List[int]):
+        start = time.perf_counter()
+        generator.append_tokens(token_ids)
+        elapsed = time.perf_counter() - start
+        self.stats["prefill_s"] += elapsed
+        self.stats["prefill_tokens"] += len(token_ids)
+        TRACER.add("llm.prefill", elapsed, start=start, tokens=len(token_ids))
+
+    def _get_prefix_generator(self):
+        """Generator whose KV cache already holds the static prefix."""
+        if self._prefix_generator is None:
+            generator = self._new_generator(self.CONTEXT_WINDOW)
+            self._prefill(generator, self._prefix_ids)
+            self._prefix_generator = generator
+        else:
+            # Drop whatever the previous batch appended after the prefix
+            self._prefix_generator.rewind_to(len(self._prefix_ids))
+        return self._prefix_generator
+
+    def _token_stream(self, input_ids: List[int], max_total_length: int) -> Iterator[str]:
+        """
+        Greedy generation, yielding decoded text piece by piece.
+        When `input_ids` starts with the static prompt prefix, its KV state
+        is reused and only the batch-specific suffix is prefilled.
+        """
+        n_prefix = len(self._prefix_ids)
+        reuse = (
+            self.reuse_prefix and self.can_rewind
+            and input_ids[:n_prefix] == self._prefix_ids
+        )
+        self.stats["prefills"] += 1
+        if reuse:
+            try:
+                generator = self._get_prefix_generator()
+                self._prefill(generator, input_ids[n_prefix:])
+            except Exception:
+                # A broken long-lived generator must not poison later batches
+                self._prefix_generator = None
+                raise
+        else:
+            generator = self._new_generator(max_total_length)
+            self._prefill(generator, input_ids)
+
+        max_new_tokens = max_total_length - len(input_ids)
+        stream = self.tokenizer.create_stream()
+        produced = 0
+        # Decode time excludes whatever the consumer does between tokens (parsing)
+        decode_start, decode_s = time.perf_counter(), 0.0
+        try:
+            while not generator.is_done() and produced < max_new_tokens:
+                step = time.perf_counter()
+                generator.generate_next_token()
+                produced += 1
+                piece = stream.decode(generator.get_next_tokens()[0])
+                decode_s += time.perf_counter() - step
+                yield piece
+        finally:
+            # Also runs when the consumer stops early (all answers parsed)
+            TRACER.add("llm.decode", decode_s, start=decode_start, tokens=produced)
+            TRACER.count("llm.generated_tokens", produced)
+
+    def _make_parser(self):
+        if self.output_format == "codes":
+            return LabelCodeStreamParser()
+        return JSONArrayStreamParser()
+
+    def _parse_piece(self, parser, piece: str, num_items: int) -> List[Tuple[int, Dict]]:
+        """Feeds one decoded piece; returns the (sentence_index, result) pairs it completed."""
+        return self._completed(parser, parser.feed(piece), num_items)
+
+    def _close_parser(self, parser, num_items: int) -> List[Tuple[int, Dict]]:
+        """End of the output; returns the pairs only the end completes (a final "16:N")."""
+        return self._completed(parser, parser.close(), num_items)
+
+    def _completed(self, parser, fed: list, num_items: int) -> List[Tuple[int, Dict]]:
+        completed = []
+        if self.output_format == "codes":
+            for number, code in fed:
+                # Unknown codes or numbers are left out, validation reports them
+                if code in LABEL_CODES and 1 <= number <= num_items:
+                    completed.append((number - 1, {"category": LABEL_CODES[code]}))
+        else:
+            # `fed` are the last items the parser collected; their array positions
+            first = len(parser.items) - len(fed)
+            for position, item in enumerate(fed, first):
+                # Prefer the sentence number the model echoed back over position
+                number = item.get("id") if isinstance(item, dict) else None
+                if isinstance(number, int) and 1 <= number <= num_items:
+                    position = number - 1
+                if isinstance(item, dict) and "id" in item:
+                    # Only used for placement; results carry category and justification
+                    item = {key: value for key, value in item.items() if key != "id"}
+                completed.append((position, item))
+        return completed
+
+    @staticmethod
+    def _parser_finished(parser, num_items: int) -> bool:
+        return parser.done or len(parser.items) >= num_items
+
+    def _stream_items(self, input_ids: List[int], max_total_length: int,
+                      num_items: int) -> Iterator[Tuple[int, Dict]]:
+        """
+        Generates token by token, decoding and parsing as it goes.
+        Yields (sentence_index, result) the moment an answer is complete and
+        stops the generator once `num_items` answers are in (or the JSON
+        array closes), so no tokens are spent on trailing chatter.
+        """
+        parser = self._make_parser()
+        pieces = []
+        self.last_output = ""
+        parse_start, parse_s = time.perf_counter(), 0.0
+
+        for piece in self._token_stream(input_ids, max_total_length):
+            pieces.append(piece)
+            step = time.perf_counter()
+            completed = self._parse_piece(parser, piece, num_items)
+            finished = self._parser_finished(parser, num_items)
+            parse_s += time.perf_counter() - step
+            yield from completed
+            if finished:
+                break
+        else:
+            yield from self._close_parser(parser, num_items)
+
+        self.last_output = "".join(pieces).strip()
+        TRACER.add("llm.parse", parse_s, start=parse_start, items=len(parser.items))
+
+    def stream_batch(self, chunks: List[str]) -> Iterator[Tuple[int, Dict]]:
+        """
+        Like `classify_batch`, but yields (sentence_index, result) pairs as
+        soon as each one is parsed from the model output. Items are not
+        validated; raises ValueError if the prompt does not fit the model.
+        """
+        if not chunks:
+            return
+        input_ids, max_total_length = self._prepare_input(chunks)
+        if max_total_length <= len(input_ids):
+            raise ValueError(f"Input too long ({len(input_ids)} tokens) for model.")
+        yield from self._stream_items(input_ids, max_total_length, len(chunks))
+
+    def _is_valid_item(self, item) -> bool:
+        if not isinstance(item, dict) or item.get("category") not in VALID_CATEGORIES:
+            return False
+        return self.output_format == "codes" or "justification" in item
+
+    def _validate(self, parsed: Dict[int, Dict], num_items: int, raw: str) -> Tuple[Dict[int, Dict], str]:
+        """Keeps the well-formed answers; `problem` describes what is missing, if anything."""
+        data = {i: item for i, item in parsed.items() if self._is_valid_item(item)}
+        if len(data) == num_items:
+            return data, ""
+        TRACER.count("llm.parse_failures")
+        if not parsed:
+            problem = "No answers found in the response."
+        else:
+            problem = f"Expected {num_items} valid items, but got {len(data)}."
+        return data, f"{problem} Raw output: {raw[:200]}..."
+
+    def _classify_once(self, chunks: List[str]) -> Tuple[Dict[int, Dict], str]:
+        """
+        One LLM call. Returns ({sentence_index: result}, problem) holding
+        every well-formed answer that could be parsed, even if others are
+        missing or broken; `problem` describes what went wrong, if anything.
+        """
+        input_ids, max_total_length = self._prepare_input(chunks)
+        if max_total_length <= len(input_ids):
+            return {}, f"Input too long ({len(input_ids)} tokens) for model."
+
+        self.last_output = ""
+        try:
+            parsed = dict(self._stream_items(input_ids, max_total_length, len(chunks)))
+        except Exception as e:
+            return {}, f"Generation error: {e}"
+        return self._validate(parsed, len(chunks), self.last_output)
+
+    def _recover(self, chunks: List[str], indices: List[int], depth: int) -> Dict[int, Dict]:
+        """
+        Classifies chunks[indices], keeping every valid answer and
+        re-submitting only the missing sentences as smaller sub-batches,
+        at most `max_retry_depth` levels deep.
+        """
+        found, problem = self._classify_once([chunks[i] for i in indices])
+        return self._retry_missing(chunks, indices, found, problem, depth)
+
+    def _retry_missing(self, chunks: List[str], indices: List[int], found: Dict[int, Dict],
+                       problem: str, depth: int) -> Dict[int, Dict]:
+        """`found` holds the answers for chunks[indices] (keyed by position in `indices`)."""
+        results = {indices[k]: item for k, item in found.items()}
+        missing = [i for i in indices if i not in results]
+        if not missing:
+            return results
+
+        print(f"[WARN] LLM answer incomplete ({len(results)}/{len(indices)} usable): {problem}")
+        if results:
+            self.stats["salvaged"] += len(results)
+        too_long = not found and problem.startswith("Input too long")
+        if depth >= self.max_retry_depth or (too_long and len(indices) == 1):
+            return results
+
+        # Nothing usable → bisect; partial answer → retry just the gaps
+        if len(missing) == len(indices) and len(missing) > 1:
+            half = (len(missing) + 1) // 2
+            parts = [missing[:half], missing[half:]]
+        else:
+            parts = [missing]
+        for part in parts:
+            self.stats["retries"] += 1
+            TRACER.count("llm.retries")
+            self.stats["retried_sentences"] += len(part)
+            results.update(self._recover(chunks, part, depth + 1))
+        return results
+
+    def _complete(self, chunks: List[str], results: Dict[int, Dict]) -> List[Dict]:
+        """Ordered results, with 'none' fallbacks for whatever could not be recovered."""
+        lost = len(chunks) - len(results)
+        if lost:
+            self.stats["fallbacks"] += lost
+            TRACER.count("llm.fallbacks", lost)
+            fallback = self._generate_fallback_response(
+                lost, f"No valid answer after {self.max_retry_depth} retries."
+            )
+            for i in range(len(chunks)):
+                if i not in results:
+                    results[i] = fallback.pop()
+        return [results[i] for i in range(len(chunks))]
+
     def classify_batch(self, chunks: List[str]) -> List[Dict]:
         """
         Takes a list of cleaned sentences, sends them to the LLM in a single
         contextual prompt, and returns a list of classification dictionaries.
+        Partial answers are salvaged and only the missing sentences retried;
+        whatever still fails after `max_retry_depth` falls back to 'none'.
         """
         if not chunks:
             return []
 
-        prompt = self._build_batch_prompt(chunks)
-
-        # ---- HF chat template (keeps the same format the model expects)
-        chat = [{"role": "user", "content": prompt}]
-        input_text = self.hf_tokenizer.apply_chat_template(
-            chat,
-            tokenize=False,
-            add_generation_prompt=True
-        )
+        self.stats["batches"] += 1
+        with TRACER.stage("llm.classify", sentences=len(chunks)):
+            results = self._recover(chunks, list(range(len(chunks))), depth=0)
+            return self._complete(chunks, results)
 
-        # ---- Encode with the ONNX tokenizer
-        input_ids = self.tokenizer.encode(input_text)
-        input_len = len(input_ids)
-
-        # ---- CRITICAL: Calculate max_length for a batch response.
-        # We need space for N JSON objects. Let's be generous.
-        # Estimate ~80 tokens per JSON object + a 256 token buffer.
-        expected_output_len = (len(chunks) * 80) + 256
-        max_total_length = min(input_len + expected_output_len, 4096)
-
-        if max_total_length <= input_len:
-             return self._generate_fallback_response(
-                len(chunks), f"Input too long ({input_len} tokens) for model."
-             )
+    # ------------------------------------------------------------------ #
+    # Multi-sequence generation – several batches decoded together
+    # ------------------------------------------------------------------ #
+    def _generate_wave(self, wave: List[List[str]]) -> List[Tuple[Dict[int, Dict], str]]:
+        """
+        Decodes several prompts as one multi-sequence generation, so every
+        step does matrix-matrix work. Each sequence has its own stream and
+        parser and is dropped from consideration as soon as it has all its
+        answers or emits EOS; the wave ends when every sequence is finished.
+        Returns (found, problem) per batch, like `_classify_once`.
+        """
+        prompts = [self._apply_chat_template(self._build_batch_prompt(batch)) for batch in wave]
+        lengths = [len(self._encode(p)) for p in prompts]
+        expected = max(self._expected_output_len(len(batch)) for batch in wave)
+        max_total_length = min(max(lengths) + expected, self.CONTEXT_WINDOW)
+        if max_total_length <= max(lengths):
+            return [self._classify_once(batch) for batch in wave]
 
-        # ---- Generation parameters
+        import onnxruntime_genai as og
         params = og.GeneratorParams(self.model)
         params.set_search_options(
+            batch_size=len(wave),
             max_length=max_total_length,
             temperature=0.0,
             do_sample=False,
         )
         generator = og.Generator(self.model, params)
-        generator.append_tokens(input_ids)
+        start = time.perf_counter()
+        generator.append_tokens(self.tokenizer.encode_batch(prompts))
+        elapsed = time.perf_counter() - start
+        self.stats["prefill_s"] += elapsed
+        self.stats["prefill_tokens"] += sum(lengths)
+        self.stats["prefills"] += 1
+        TRACER.count("llm.prompt_tokens", sum(lengths))
+        TRACER.add("llm.prefill", elapsed, start=start, tokens=sum(lengths))
 
-        # ---- Generate token-by-token until EOS
-        generated_tokens = []
-        while not generator.is_done():
+        streams = [self.tokenizer.create_stream() for _ in wave]
+        parsers = [self._make_parser() for _ in wave]
+        parsed: List[Dict[int, Dict]] = [{} for _ in wave]
+        pieces: List[List[str]] = [[] for _ in wave]
+        finished = [False] * len(wave)
+        decode_start, decode_s, produced = time.perf_counter(), 0.0, 0
+
+        while not generator.is_done() and not all(finished):
+            step = time.perf_counter()
             generator.generate_next_token()
-            token = generator.get_next_tokens()[0]
-            generated_tokens.append(token)
+            decode_s += time.perf_counter() - step
+            for k, token in enumerate(generator.get_next_tokens()):
+                if finished[k]:
+                    continue
+                if int(token) in self._eos_ids:
+                    finished[k] = True
+                    continue
+                produced += 1
+                piece = streams[k].decode(token)
+                pieces[k].append(piece)
+                parsed[k].update(self._parse_piece(parsers[k], piece, len(wave[k])))
+                finished[k] = self._parser_finished(parsers[k], len(wave[k]))
+        for k, batch in enumerate(wave):
+            if not self._parser_finished(parsers[k], len(batch)):
+                parsed[k].update(self._close_parser(parsers[k], len(batch)))
+        del generator
+        # Per-sequence detokenizing and parsing are left in the wall time of "llm.wave"
+        TRACER.add("llm.decode", decode_s, start=decode_start, tokens=produced)
+        TRACER.count("llm.generated_tokens", produced)
 
-        # ---- Decode
-        answer = self.tokenizer.decode(generated_tokens).strip()
+        return [
+            self._validate(parsed[k], len(batch), "".join(pieces[k]).strip())
+            for k, batch in enumerate(wave)
+        ]
 
-        # ---- Robust JSON List extraction and validation
-        try:
-            # Find the JSON array within the model's output
-            json_str_match = re.search(r'\[\s*\{.*\}\s*\]', answer, re.S)
-            if not json_str_match:
-                raise ValueError("No JSON array found in the response.")
+    def classify_stream(self, batches: Iterable[List[str]],
+                        num_sequences: int = 4) -> Iterator[Tuple[int, List[Dict]]]:
+        """
+        Consumes a queue of sentence batches and decodes up to
+        `num_sequences` of them at a time. Yields (batch_index, results) in
+        input order as each wave completes; results match `classify_batch`,
+        including salvage and retries of missing sentences.
 
-            json_str = json_str_match.group(0)
-            data = json.loads(json_str)
+        onnxruntime-genai cannot add sequences to a running generator, so a
+        new wave starts once every sequence of the current one has finished.
+        """
+        num_sequences = max(1, num_sequences)
+        queue = iter(batches)
+        index = 0
+        while True:
+            wave = list(islice(queue, num_sequences))
+            if not wave:
+                return
+            non_empty = [k for k, batch in enumerate(wave) if batch]
+            outcomes = {}
+            with TRACER.stage("llm.wave", sequences=len(non_empty), sentences=sum(map(len, wave))):
+                if len(non_empty) == 1:
+                    k = non_empty[0]
+                    outcomes[k] = self._classify_once(wave[k])
+                elif non_empty:
+                    try:
+                        answers = self._generate_wave([wave[k] for k in non_empty])
+                    except Exception as e:
+                        answers = [({}, f"Generation error: {e}")] * len(non_empty)
+                    outcomes = dict(zip(non_empty, answers))
 
-            # Validate the response
-            if not isinstance(data, list):
-                raise TypeError("Response is not a list.")
-            if len(data) != len(chunks):
-                raise ValueError(f"Expected {len(chunks)} items, but got {len(data)}.")
+            for k, batch in enumerate(wave):
+                if not batch:
+                    yield index + k, []
+                    continue
+                self.stats["batches"] += 1
+                indices = list(range(len(batch)))
+                found, problem = outcomes[k]
+                results = self._retry_missing(batch, indices, found, problem, depth=0)
+                yield index + k, self._complete(batch, results)
+            index += len(wave)
 
-            # Check if each item is a valid dictionary
-            for item in data:
-                if not isinstance(item, dict) or not {"category", "justification"} <= item.keys():
-                    raise ValueError("List item is not a valid dictionary with required keys.")
+    def classify_many(self, batches: List[List[str]], num_sequences: int = 4) -> List[List[Dict]]:
+        """`classify_batch` over many batches, decoded `num_sequences` at a time."""
+        return [results for _, results in self.classify_stream(batches, num_sequences)]
 
-            return data
+    def report(self) -> str:
+        st = self.stats
+        prefill_ms = 1000 * st["prefill_s"] / st["prefills"] if st["prefills"] else 0.0
+        return (
+            f"{st['batches']} batches, {st['salvaged']} answers salvaged from partial output, "
+            f"{st['retries']} retry calls ({st['retried_sentences']} sentences), "
+            f"{st['fallbacks']} sentences fell back to 'none', "
+            f"prefill {prefill_ms:.1f} ms/call"
+        )
 
-        except Exception as e:
-            # If anything goes wrong, return a fallback response for the whole batch
-            return self._generate_fallback_response(
-                len(chunks), f"Parse error: {e}. Raw output: {answer[:200]}..."
-            )
+    # ------------------------------------------------------------------ #
+    # On-demand justifications (compact mode)
+    # ------------------------------------------------------------------ #
+    def justify(self, chunks: List[str], categories: List[str]) -> List[str]:
+        """
+        Short explanations for already-labelled sentences, one per sentence.
+        Meant to be called only for sentences that end up highlighted.
+        Missing lines come back as empty strings.
+        """
+        if not chunks:
+            return []
+
+        formatted_sentences = "\n".join(
+            f"{i+1}. [{cat}] \"{s}\"" for i, (s, cat) in enumerate(zip(chunks, categories))
+        )
+        prompt = JUSTIFICATION_PROMPT_TEMPLATE.format(
+            num_sentences=len(chunks),
+            formatted_sentences=formatted_sentences
+        )
+        input_ids = self._encode(self._apply_chat_template(prompt))
+        max_total_length = min(
+            len(input_ids) + len(chunks) * self.OUTPUT_TOKENS_PER_SENTENCE + self.OUTPUT_BUFFER_TOKENS,
+            self.CONTEXT_WINDOW,
+        )
+        if max_total_length <= len(input_ids):
+            return [""] * len(chunks)
+
+        answer = "".join(self._token_stream(input_ids, max_total_length))
+        found = {}
+        for match in re.finditer(r"^\s*(\d+)\s*[:.)]\s*(.+?)\s*$", answer, re.M):
+            found.setdefault(int(match.group(1)), match.group(2))
+        return [found.get(i + 1, "") for i in range(len(chunks))]
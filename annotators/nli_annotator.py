@@ -1,41 +1,102 @@
 from annotators.base import AnnotatorStrategy
 from config.labels import LABELS
-import fitz  # PyMuPDF
-from typing import List, Dict
+from typing import List, Dict, Tuple
+import numpy as np
 from tqdm import tqdm
-from transformers import pipeline
+
+from utils.instrumentation import TRACER
+
+# torch and transformers are imported when a strategy is built, so the ONNX
+# subclass and CLI `--help` never load them
 
 class ZeroShotSentence(AnnotatorStrategy):
     """Sentence-level zero-shot classification that obeys the batch interface."""
-    
-    def __init__(self, model_name: str = "MoritzLaurer/DeBERTa-v3-base-mnli-fever-anli"):
+
+    HYPOTHESIS_TEMPLATE = "This sentence is about {}."
+
+    def __init__(self, model_name: str = "MoritzLaurer/DeBERTa-v3-base-mnli-fever-anli",
+                 batch_size: int = 32):
+        import torch
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification
         print(f"[INFO] Loading Zero-Shot classification model: {model_name} ...")
-        self.classifier = pipeline(
-            "zero-shot-classification",
-            model=model_name,
-            device=0,                     # GPU if available
-            batch_size=1,                 # we will batch manually
-        )
-        self.hypothesis_template = "This sentence is about {}."
-        print("[INFO] Model loaded.")
+        self.model_id = model_name
+        self.device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
+        with TRACER.stage("nli.load"):
+            self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+            self.model = AutoModelForSequenceClassification.from_pretrained(model_name)
+            self.model.to(self.device).eval()
+        self.batch_size = max(1, batch_size)   # (sentence, hypothesis) pairs per forward pass
+        self.hypothesis_template = self.HYPOTHESIS_TEMPLATE
+        self.prompt_version = self.hypothesis_template
+        self.hypotheses = [self.hypothesis_template.format(label) for label in LABELS]
+        self.entailment_id = self._find_entailment_id(self.model.config.label2id)
+        print(f"[INFO] Model loaded on {self.device}.")
+
+    @staticmethod
+    def _find_entailment_id(label2id: Dict[str, int]) -> int:
+        """Index of the 'entailment' logit, same lookup the HF zero-shot pipeline does."""
+        for label, idx in label2id.items():
+            if label.lower().startswith("entail"):
+                return idx
+        return -1
 
     # ------------------------------------------------------------------ #
-    # PRIVATE – single-sentence classification (unchanged from your code)
+    # PRIVATE – batched NLI engine
     # ------------------------------------------------------------------ #
-    def _classify_sentence(self, text: str) -> Dict:
-        result = self.classifier(
-            text,
-            LABELS,
-            hypothesis_template=self.hypothesis_template,
-            multi_label=False,
-        )
-        top_label = result["labels"][0]
-        top_score = result["scores"][0]
+    def _build_pairs(self, chunks: List[str]) -> List[Tuple[int, int, str, str]]:
+        """
+        Every (sentence, hypothesis) pair for the whole batch, sorted by length
+        so each padded tensor batch holds inputs of similar size.
+        """
+        pairs = [
+            (s_idx, l_idx, sentence, hypothesis)
+            for s_idx, sentence in enumerate(chunks)
+            for l_idx, hypothesis in enumerate(self.hypotheses)
+        ]
+        pairs.sort(key=lambda p: len(p[2]) + len(p[3]))
+        return pairs
+
+    def _entailment_logits(self, premises: List[str], hypotheses: List[str]) -> np.ndarray:
+        """One padded forward pass → entailment logit per pair."""
+        import torch
+        inputs = self.tokenizer(
+            premises,
+            hypotheses,
+            padding=True,
+            truncation="only_first",
+            return_tensors="pt",
+        ).to(self.device)
+        with torch.inference_mode():
+            logits = self.model(**inputs).logits
+        return logits[:, self.entailment_id].float().cpu().numpy()
+
+    def _score_matrix(self, chunks: List[str]) -> np.ndarray:
+        """Entailment logits as a (num_sentences, num_labels) matrix."""
+        pairs = self._build_pairs(chunks)
+        scores = np.empty((len(chunks), len(self.hypotheses)), dtype=np.float32)
+        for start in tqdm(range(0, len(pairs), self.batch_size), desc="Zero-shot NLI", leave=False):
+            batch = pairs[start:start + self.batch_size]
+            s_idx, l_idx, premises, hypotheses = zip(*batch)
+            with TRACER.stage("nli.forward", pairs=len(batch)):
+                scores[list(s_idx), list(l_idx)] = self._entailment_logits(list(premises), list(hypotheses))
+        return scores
+
+    @staticmethod
+    def _softmax(scores: np.ndarray) -> np.ndarray:
+        """Softmax over labels (multi_label=False semantics of the HF pipeline)."""
+        shifted = np.exp(scores - scores.max(axis=1, keepdims=True))
+        return shifted / shifted.sum(axis=1, keepdims=True)
+
+    def _to_annotation(self, text: str, probs: np.ndarray) -> Dict:
+        second, top = np.argsort(probs)[-2:]
+        top_label = LABELS[top]
+        top_score = float(probs[top])
         category_key = top_label.replace(" ", "_")
 
         return {
             "category": category_key,
             "confidence": top_score,
+            "margin": top_score - float(probs[second]),   # gap to the runner-up label
             "evidence": [text],
             "justification": f"Zero-shot classified as '{top_label}' with {top_score:.2f} confidence."
         }
@@ -48,9 +109,8 @@ class ZeroShotSentence(AnnotatorStrategy):
         `chunks` → list of *individual* sentences (already cleaned & filtered).
         Returns a list of dicts, one per sentence, in the same order.
         """
-        annotations = []
-        # tqdm gives you a nice progress bar for long papers
-        for sentence in tqdm(chunks, desc="Zero-shot NLI", leave=False):
-            ann = self._classify_sentence(sentence)
-            annotations.append(ann)
-        return annotations
\ No newline at end of file
+        if not chunks:
+            return []
+        with TRACER.stage("nli.classify", sentences=len(chunks)):
+            probs = self._softmax(self._score_matrix(chunks))
+            return [self._to_annotation(text, row) for text, row in zip(chunks, probs)]
@@ -0,0 +1,134 @@
+import json
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+from annotators.nli_annotator import ZeroShotSentence
+from config.labels import LABELS
+from utils.instrumentation import TRACER
+
+ONNX_FILE = "model.onnx"
+ONNX_INT8_FILE = "model.int8.onnx"
+
+
+def onnx_model_path(model_dir: Path, quantized: Optional[bool] = None) -> Path:
+    """
+    The graph to load from an `export_nli_onnx` folder. `quantized=None`
+    picks fp32 when this onnxruntime build has CUDA (int8 dynamic
+    quantization targets CPU kernels) and int8 otherwise, falling back to
+    fp32 if no int8 graph was exported.
+    """
+    model_dir = Path(model_dir)
+    if quantized is not None:
+        return model_dir / (ONNX_INT8_FILE if quantized else ONNX_FILE)
+    import onnxruntime as ort
+    if "CUDAExecutionProvider" in ort.get_available_providers() or not (model_dir / ONNX_INT8_FILE).exists():
+        return model_dir / ONNX_FILE
+    return model_dir / ONNX_INT8_FILE
+
+
+class ZeroShotONNXSentence(ZeroShotSentence):
+    """
+    Same batched zero-shot NLI engine as ZeroShotSentence, but the MNLI
+    model runs from a local ONNX file through onnxruntime. By default
+    (`quantized=None`) the fp32 graph runs on CUDA when this onnxruntime
+    build has it, and the int8 graph on CPU otherwise (see
+    `onnx_model_path`); `self.device` says which one is active.
+
+    `model_dir` is a folder written by `export_nli_onnx` (ONNX graph,
+    tokenizer and config.json).
+    """
+
+    def __init__(self, model_dir: Path, quantized: Optional[bool] = None, batch_size: int = 32,
+                 intra_op_threads: int = 0, inter_op_threads: int = 0):
+        # No torch model here, so ZeroShotSentence.__init__ is not called
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+        model_dir = Path(model_dir)
+        onnx_path = onnx_model_path(model_dir, quantized)
+        quantized = onnx_path.name == ONNX_INT8_FILE
+        if not onnx_path.exists():
+            raise FileNotFoundError(f"ONNX model not found: {onnx_path} (run export_nli_onnx first)")
+        print(f"[INFO] Loading Zero-Shot ONNX model: {onnx_path} ...")
+        self.model_id = str(onnx_path)
+        self.batch_size = max(1, batch_size)
+        self.hypothesis_template = self.HYPOTHESIS_TEMPLATE
+        self.prompt_version = self.hypothesis_template
+        self.hypotheses = [self.hypothesis_template.format(label) for label in LABELS]
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        with open(model_dir / "config.json", encoding="utf-8") as f:
+            self.entailment_id = self._find_entailment_id(json.load(f)["label2id"])
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = intra_op_threads   # 0 = onnxruntime default
+        options.inter_op_num_threads = inter_op_threads
+        providers = ["CPUExecutionProvider"]
+        # int8 dynamic quantization targets CPU kernels; keep fp32 graphs for CUDA
+        if "CUDAExecutionProvider" in ort.get_available_providers() and not quantized:
+            providers.insert(0, "CUDAExecutionProvider")
+        with TRACER.stage("nli.load"):
+            self.session = ort.InferenceSession(str(onnx_path), options, providers=providers)
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.device = "cuda" if self.session.get_providers()[0] == "CUDAExecutionProvider" else "cpu"
+        print(f"[INFO] Model loaded on {self.device} ({self.session.get_providers()[0]}).")
+
+    def _entailment_logits(self, premises: List[str], hypotheses: List[str]) -> np.ndarray:
+        """One padded onnxruntime run → entailment logit per pair."""
+        inputs = self.tokenizer(
+            premises,
+            hypotheses,
+            padding=True,
+            truncation="only_first",
+            return_tensors="np",
+        )
+        feed = {name: value.astype(np.int64) for name, value in inputs.items() if name in self.input_names}
+        logits = self.session.run(None, feed)[0]
+        return logits[:, self.entailment_id].astype(np.float32)
+
+
+# ==========================================================
+# Export: HF checkpoint → ONNX (+ dynamic int8)
+# ==========================================================
+def export_nli_onnx(model_name: str, out_dir: Path, quantize: bool = True,
+                    opset: int = 17) -> Path:
+    """
+    Exports an HF sequence-classification (MNLI) model to `out_dir/model.onnx`
+    with dynamic batch/sequence axes, saves tokenizer and config next to it,
+    and optionally writes a dynamically int8-quantized `model.int8.onnx`.
+    """
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+
+    sample = tokenizer(["A sample premise."], ["This sentence is about method."], return_tensors="pt")
+    input_names = list(sample.keys())
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+
+    print(f"[INFO] Exporting {model_name} → {out_dir / ONNX_FILE} ...")
+    with torch.inference_mode():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            str(out_dir / ONNX_FILE),
+            input_names=input_names,
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+        )
+    tokenizer.save_pretrained(out_dir)
+    model.config.save_pretrained(out_dir)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        print(f"[INFO] Quantizing → {out_dir / ONNX_INT8_FILE} ...")
+        quantize_dynamic(str(out_dir / ONNX_FILE), str(out_dir / ONNX_INT8_FILE),
+                         weight_type=QuantType.QInt8)
+    return out_dir
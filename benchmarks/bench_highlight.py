@@ -0,0 +1,60 @@
+"""
+Highlight-writing time per save mode, with and without stored geometry.
+
+    python -m benchmarks.bench_highlight [--pdf paper.pdf] [--pages 100]
+
+Without --pdf a synthetic document is generated. Every sentence gets a
+deterministic non-'none' category, so all of them are written.
+"""
+import argparse
+import shutil
+import tempfile
+from pathlib import Path
+
+from benchmarks.synthetic import synthetic_pdf
+from config.labels import CATEGORY_COLORS
+from utils.highlighting import SAVE_MODES, add_highlights
+from utils.pdf_extract import extract_and_clean_text_by_sentence
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure add_highlights time for each save mode.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("--pdf", type=Path, default=None, help="Annotate this PDF instead of a synthetic one.")
+    parser.add_argument("--pages", type=int, default=100, help="Pages of the synthetic PDF.")
+    args = parser.parse_args()
+
+    categories = list(CATEGORY_COLORS)
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        source = tmp / "input.pdf"
+        if args.pdf:
+            shutil.copy(args.pdf, source)
+        else:
+            synthetic_pdf(source, args.pages)
+
+        for geometry in (False, True):
+            chunks = extract_and_clean_text_by_sentence(source, with_geometry=geometry)
+            annotations = [
+                (page_idx, text, {"category": categories[i % len(categories)]}, *rest)
+                for i, (page_idx, text, *rest) in enumerate(chunks)
+            ]
+            for mode in SAVE_MODES:
+                target = tmp / f"out_{mode}.pdf"
+                if mode == "incremental":
+                    # Incremental saves write into their input, so work on a copy
+                    shutil.copy(source, target)
+                    writer = add_highlights(target, annotations, target, save_mode=mode)
+                else:
+                    writer = add_highlights(source, annotations, target, save_mode=mode)
+                size_mb = target.stat().st_size / 1e6
+                label = f"{'geometry' if geometry else 'search'}/{mode}"
+                print(f"{label:>20}: annotate {writer.timings['annotate_s']:6.2f}s, "
+                      f"save {writer.timings['save_s']:6.2f}s, {size_mb:6.1f} MB, "
+                      f"{writer.annotations} annotations")
+
+
+if __name__ == "__main__":
+    main()
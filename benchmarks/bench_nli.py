@@ -0,0 +1,94 @@
+"""
+Zero-shot NLI throughput (sentences/sec) per backend on the same sentences.
+
+    python -m benchmarks.bench_nli [--onnx-dir exported_model] [--pdf paper.pdf]
+
+Backends: the transformers zero-shot pipeline (one sentence at a time, the
+original implementation), the batched torch engine (ZeroShotSentence) and,
+with --onnx-dir, onnxruntime in fp32 and int8 (ZeroShotONNXSentence).
+"""
+import argparse
+import time
+from pathlib import Path
+
+from benchmarks.synthetic import SYNTHETIC_SENTENCES
+from config.labels import LABELS
+from utils.pdf_extract import extract_and_clean_text_by_sentence
+
+
+def run_pipeline(model_name: str, sentences, template: str):
+    import torch
+    from transformers import pipeline
+    classifier = pipeline(
+        "zero-shot-classification",
+        model=model_name,
+        device=0 if torch.cuda.is_available() else -1,
+    )
+    classifier(sentences[0], candidate_labels=LABELS, hypothesis_template=template)   # warm-up
+    start = time.perf_counter()
+    for sentence in sentences:
+        classifier(sentence, candidate_labels=LABELS, hypothesis_template=template)
+    return time.perf_counter() - start
+
+
+def run_strategy(strategy, sentences, batch_size: int):
+    strategy.classify_batch(sentences[:1])   # warm-up
+    start = time.perf_counter()
+    for i in range(0, len(sentences), batch_size):
+        strategy.classify_batch(sentences[i:i + batch_size])
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare zero-shot NLI throughput: HF pipeline, batched torch, onnxruntime fp32/int8.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("--model", type=str, default="MoritzLaurer/DeBERTa-v3-base-mnli-fever-anli",
+                        help="Hugging Face model for the pipeline and torch backends.")
+    parser.add_argument("--onnx-dir", type=Path, default=None,
+                        help="Folder written by examples/export_nli_onnx.py; adds the ONNX backends.")
+    parser.add_argument("--pdf", type=Path, default=None, help="Take sentences from this PDF instead of synthetic ones.")
+    parser.add_argument("-n", "--sentences", type=int, default=64, help="Number of sentences to classify.")
+    parser.add_argument("-b", "--batch-size", type=int, default=32, help="(sentence, label) pairs per forward pass.")
+    parser.add_argument("--threads", type=int, default=0, help="ONNX intra-op threads (0 = onnxruntime default).")
+    parser.add_argument("--skip-pipeline", action="store_true", help="Leave out the slow per-sentence pipeline.")
+    args = parser.parse_args()
+
+    if args.pdf:
+        sentences = [chunk[1] for chunk in extract_and_clean_text_by_sentence(args.pdf)]
+    else:
+        sentences = SYNTHETIC_SENTENCES * (args.sentences // len(SYNTHETIC_SENTENCES) + 1)
+    sentences = sentences[:args.sentences]
+    if not sentences:
+        parser.error("No sentences to benchmark.")
+
+    from annotators.nli_annotator import ZeroShotSentence
+    # Sentences per classify_batch call; the strategies split them into pairs themselves
+    chunk = max(1, args.batch_size)
+    timings = {}
+
+    if not args.skip_pipeline:
+        timings["hf pipeline"] = run_pipeline(args.model, sentences, ZeroShotSentence.HYPOTHESIS_TEMPLATE)
+
+    torch_strategy = ZeroShotSentence(args.model, batch_size=args.batch_size)
+    timings["torch batched"] = run_strategy(torch_strategy, sentences, chunk)
+    del torch_strategy
+
+    if args.onnx_dir:
+        from annotators.nli_onnx_annotator import ZeroShotONNXSentence
+        onnx_dir = args.onnx_dir.expanduser().resolve()
+        for label, quantized in (("onnx fp32", False), ("onnx int8", True)):
+            strategy = ZeroShotONNXSentence(onnx_dir, quantized=quantized, batch_size=args.batch_size,
+                                            intra_op_threads=args.threads)
+            timings[label] = run_strategy(strategy, sentences, chunk)
+
+    print(f"[INFO] {len(sentences)} sentences × {len(LABELS)} labels")
+    baseline = next(iter(timings.values()))
+    for label, seconds in timings.items():
+        print(f"{label:>14}: {len(sentences) / seconds:8.1f} sentences/s  "
+              f"({seconds:6.2f} s, {baseline / seconds:4.1f}× vs {next(iter(timings))})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Prefill time per LLM batch, with and without the reused static-prompt KV state.
+
+    python -m benchmarks.bench_prefill /path/to/onnx_folder [--pdf paper.pdf]
+
+Each batch is prefilled and one token generated, so decode time is left out.
+"""
+import argparse
+import statistics
+from pathlib import Path
+
+from annotators.llm_annotator import Phi3ONNXStrategy
+from benchmarks.synthetic import SYNTHETIC_SENTENCES
+from utils.pdf_extract import extract_and_clean_text_by_sentence
+
+
+def time_prefill(strategy: Phi3ONNXStrategy, batches, reuse: bool):
+    strategy.reuse_prefix = reuse
+    strategy._prefix_generator = None
+    timings = []
+    for batch in batches:
+        input_ids, max_total_length = strategy._prepare_input(batch)
+        before = strategy.stats["prefill_s"]
+        stream = strategy._token_stream(input_ids, max_total_length)
+        next(stream, None)
+        stream.close()
+        timings.append(strategy.stats["prefill_s"] - before)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure Phi-3 prefill time per batch with and without static-prefix reuse.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("onnx_folder", type=Path, help="Path to the ONNX model directory.")
+    parser.add_argument("--pdf", type=Path, default=None, help="Take sentences from this PDF instead of synthetic ones.")
+    parser.add_argument("-b", "--batch-size", type=int, default=8, help="Sentences per batch.")
+    parser.add_argument("-n", "--batches", type=int, default=20, help="Number of batches to time.")
+    args = parser.parse_args()
+
+    if args.pdf:
+        sentences = [chunk[1] for chunk in extract_and_clean_text_by_sentence(args.pdf)]
+    else:
+        sentences = SYNTHETIC_SENTENCES * (args.batch_size * args.batches // len(SYNTHETIC_SENTENCES) + 1)
+    batch_size = max(1, args.batch_size)
+    batches = [sentences[i:i + batch_size] for i in range(0, len(sentences), batch_size)][:args.batches]
+    if not batches:
+        parser.error("No sentences to benchmark.")
+
+    strategy = Phi3ONNXStrategy(args.onnx_folder.expanduser().resolve())
+    if not strategy.can_rewind:
+        print("[WARN] This onnxruntime-genai build has no Generator.rewind_to; "
+              "reuse only saves re-encoding the prefix.")
+
+    print(f"[INFO] Static prefix: {len(strategy._prefix_ids)} tokens, {len(batches)} batches of {batch_size}")
+    # Warm-up so session initialisation is not billed to the first mode
+    time_prefill(strategy, batches[:1], reuse=False)
+
+    for label, reuse in (("full prompt", False), ("reused prefix", True)):
+        timings = time_prefill(strategy, batches, reuse)
+        # The one-off prefix prefill lands on the first reused batch; report it apart
+        print(
+            f"{label:>14}: mean {1000 * statistics.mean(timings):7.1f} ms/batch, "
+            f"median {1000 * statistics.median(timings):7.1f} ms/batch, "
+            f"first {1000 * timings[0]:7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
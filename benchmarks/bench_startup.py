@@ -0,0 +1,66 @@
+"""
+Cold-start time of the command-line tools, each measured in a fresh interpreter.
+
+    python -m benchmarks.bench_startup [--onnx-folder /path/to/onnx_folder] [--nli-model NAME]
+
+Always times `--help` of main_llm and main_nli (imports and argument
+parsing only) and the bare module imports. With --onnx-folder /
+--nli-model it also times building the strategy, i.e. what a
+single-paper job pays before its first batch.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def time_command(args, repeat: int):
+    """Wall seconds of `python <args>` run `repeat` times from the repository root."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=REPO_ROOT, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure CLI cold-start time in fresh interpreters.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("--onnx-folder", type=Path, default=None, help="Also time building Phi3ONNXStrategy from this folder.")
+    parser.add_argument("--nli-model", type=str, default=None, help="Also time building ZeroShotSentence with this model.")
+    parser.add_argument("-n", "--repeat", type=int, default=5, help="Runs per command.")
+    args = parser.parse_args()
+
+    commands = {
+        "python -c pass": ["-c", "pass"],
+        "main_llm --help": ["-m", "examples.main_llm", "--help"],
+        "main_nli --help": ["-m", "examples.main_nli", "--help"],
+        "import llm_annotator": ["-c", "import annotators.llm_annotator"],
+        "import nli_annotator": ["-c", "import annotators.nli_annotator"],
+    }
+    if args.onnx_folder:
+        commands["build Phi3ONNXStrategy"] = [
+            "-c", "import sys; from annotators.llm_annotator import Phi3ONNXStrategy; Phi3ONNXStrategy(sys.argv[1])",
+            str(args.onnx_folder),
+        ]
+    if args.nli_model:
+        commands["build ZeroShotSentence"] = [
+            "-c", "import sys; from annotators.nli_annotator import ZeroShotSentence; ZeroShotSentence(sys.argv[1])",
+            args.nli_model,
+        ]
+
+    for label, command in commands.items():
+        timings = time_command(command, args.repeat)
+        print(f"{label:>24}: median {statistics.median(timings):6.3f}s, min {min(timings):6.3f}s")
+
+
+if __name__ == "__main__":
+    main()
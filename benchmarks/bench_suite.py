@@ -0,0 +1,234 @@
+"""
+End-to-end benchmark on synthetic multi-column papers with a stub model.
+
+    python -m benchmarks.bench_suite [--pages 10 100 1000] [--pipelines nli llm]
+    python -m benchmarks.bench_suite --save-baseline bench_baseline.json
+    python -m benchmarks.bench_suite --baseline bench_baseline.json --threshold 0.15
+
+Every (pipeline, page count) pair runs the real `main_nli.py` /
+`main_llm.py` in a fresh interpreter, with the model class replaced by
+`StubStrategy`, so extraction, the batching loops and `add_highlights`
+are timed without models, GPU or network. Stage times come from the
+instrumentation (`utils.instrumentation`); memory is the peak RSS at the
+end of each stage. With --baseline, any time or memory figure more than
+--threshold above the baseline is flagged and the exit code is 1.
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.stub_strategy import StubStrategy
+from benchmarks.synthetic import synthetic_paper
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# pipeline → (script module, model class the stub replaces)
+PIPELINES = {
+    "nli": ("examples.main_nli", "ZeroShotSentence"),
+    "llm": ("examples.main_llm", "Phi3ONNXStrategy"),
+}
+
+# Stages reported per run, in pipeline order
+STAGES = ["extract", "stub.classify", "highlight.annotate", "highlight.save"]
+
+MIN_RSS_DELTA_MB = 10.0   # smaller memory differences are noise
+
+
+# ==========================================================
+# Worker: one pipeline run in this interpreter
+# ==========================================================
+def run_worker(args):
+    from utils.instrumentation import TRACER
+
+    module_name, class_name = PIPELINES[args.worker]
+    module = importlib.import_module(module_name)
+    stub = type("Stub", (StubStrategy,), {
+        "highlight_ratio": args.highlight_ratio,
+        "seconds_per_sentence": args.model_ms / 1000,
+    })
+    setattr(module, class_name, stub)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        argv = [str(args.pdf)]
+        if args.worker == "llm":
+            argv.append(tmp)   # the "ONNX folder" only has to exist
+        argv += ["-o", str(Path(tmp) / "out.pdf"), "--save-mode", args.save_mode]
+        if args.geometry:
+            argv.append("--geometry")
+        if args.section_filter:
+            argv.append("--section-filter")
+        sys.argv = [module_name, *argv]
+
+        TRACER.enable()
+        start = time.perf_counter()
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            module.main()
+        total_s = time.perf_counter() - start
+
+    summary = TRACER.summary()
+    stages = {}
+    for name, st in summary["stages"].items():
+        peaks = [e["peak_rss_mb"] for e in TRACER.events if e["name"] == name and e["peak_rss_mb"] is not None]
+        stages[name] = {"wall_s": st["wall_s"], "cpu_s": st["cpu_s"], "calls": st["calls"],
+                        "peak_rss_mb": max(peaks) if peaks else None}
+    sentences = summary["stages"].get("extract", {}).get("sentences", 0)
+    result = {
+        "total_s": total_s,
+        "sentences": int(sentences),
+        "stages": stages,
+        "counters": summary["counters"],
+        "peak_rss_mb": summary["peak_rss_mb"],
+    }
+    args.result.write_text(json.dumps(result), encoding="utf-8")
+
+
+# ==========================================================
+# Driver
+# ==========================================================
+def run_once(pipeline: str, pdf_path: Path, args, result_path: Path) -> Dict:
+    """Runs one pipeline in a fresh interpreter, so imports and peak RSS start from zero."""
+    command = [
+        sys.executable, "-m", "benchmarks.bench_suite",
+        "--worker", pipeline, "--pdf", str(pdf_path), "--result", str(result_path),
+        "--highlight-ratio", str(args.highlight_ratio), "--model-ms", str(args.model_ms),
+        "--save-mode", args.save_mode,
+    ]
+    if args.geometry:
+        command.append("--geometry")
+    if args.section_filter:
+        command.append("--section-filter")
+    done = subprocess.run(command, cwd=REPO_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if done.returncode != 0:
+        raise RuntimeError(f"{pipeline} run failed:\n{done.stderr[-2000:]}")
+    return json.loads(result_path.read_text(encoding="utf-8"))
+
+
+def format_run(key: str, pages: int, run: Dict) -> str:
+    stages = run["stages"]
+    parts = [f"{key:>10}: {run['sentences']:>6} sentences, total {run['total_s']:7.2f}s "
+             f"({run['sentences'] / run['total_s']:7.0f} sent/s, {pages / run['total_s']:6.1f} pages/s)"]
+    for name in STAGES:
+        if name in stages:
+            parts.append(f"{name} {stages[name]['wall_s']:.2f}s")
+    if run["peak_rss_mb"] is not None:
+        parts.append(f"peak RSS {run['peak_rss_mb']:.0f} MB")
+    return " | ".join(parts)
+
+
+def compare(current: Dict, baseline: Dict, threshold: float, min_delta_s: float) -> List[str]:
+    """Human-readable lines for every figure that got worse than `threshold` (relative) allows."""
+    regressions = []
+    for key, run in current["runs"].items():
+        base = baseline.get("runs", {}).get(key)
+        if base is None:
+            continue
+        figures = [("total_s", run["total_s"], base["total_s"], min_delta_s),
+                   ("peak_rss_mb", run["peak_rss_mb"], base.get("peak_rss_mb"), MIN_RSS_DELTA_MB)]
+        for name in STAGES:
+            if name in run["stages"] and name in base["stages"]:
+                figures.append((f"{name}.wall_s", run["stages"][name]["wall_s"],
+                                base["stages"][name]["wall_s"], min_delta_s))
+        for name, now, before, min_delta in figures:
+            if now is None or not before:
+                continue
+            if now > before * (1 + threshold) and now - before > min_delta:
+                regressions.append(f"{key} {name}: {before:.3f} → {now:.3f} (+{now / before - 1:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time the annotation pipelines on synthetic papers with a stub model; compare against a baseline.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 1000], help="Page counts of the synthetic papers.")
+    parser.add_argument("--pipelines", choices=sorted(PIPELINES), nargs="+", default=sorted(PIPELINES), help="Scripts to run.")
+    parser.add_argument("--columns", type=int, default=2, help="Text columns per page.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic text.")
+    parser.add_argument("-n", "--repeat", type=int, default=1, help="Runs per configuration; the fastest is kept.")
+    parser.add_argument("--highlight-ratio", type=float, default=0.3, help="Share of sentences the stub labels as highlighted.")
+    parser.add_argument("--model-ms", type=float, default=0.0, help="Simulated model time per sentence, in milliseconds.")
+    parser.add_argument("--geometry", action="store_true", help="Run the scripts with --geometry.")
+    parser.add_argument("--section-filter", action="store_true", help="Run the scripts with --section-filter.")
+    parser.add_argument("--save-mode", choices=["full", "fast"], default="full", help="Save mode passed to the scripts.")
+    parser.add_argument("--work-dir", type=Path, default=None, help="Keep the synthetic PDFs here and reuse them across runs.")
+    parser.add_argument("--output", type=Path, default=None, help="Write this run's results as JSON.")
+    parser.add_argument("--save-baseline", type=Path, default=None, help="Store this run's results as the baseline.")
+    parser.add_argument("--baseline", type=Path, default=None, help="Compare against this baseline and flag regressions.")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Relative slowdown (or memory growth) counted as a regression.")
+    parser.add_argument("--min-delta", type=float, default=0.05, help="Ignore time differences below this many seconds.")
+    # Internal: a single pipeline run, started by the driver in a fresh interpreter
+    parser.add_argument("--worker", choices=sorted(PIPELINES), default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--pdf", type=Path, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--result", type=Path, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    baseline = None
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "config": {key: getattr(args, key) for key in
+                       ("columns", "seed", "highlight_ratio", "model_ms", "geometry", "section_filter", "save_mode")},
+        },
+        "runs": {},
+    }
+    if baseline and baseline.get("meta", {}).get("config") != results["meta"]["config"]:
+        print("[WARN] Baseline was recorded with different settings; comparisons may not be meaningful.")
+    if baseline and baseline.get("meta", {}).get("platform") != results["meta"]["platform"]:
+        print("[WARN] Baseline was recorded on another machine or platform.")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = args.work_dir or Path(tmp)
+        work_dir.mkdir(parents=True, exist_ok=True)
+        for pages in args.pages:
+            pdf_path = work_dir / f"paper_{pages}p_{args.columns}col_seed{args.seed}.pdf"
+            if not pdf_path.exists():
+                start = time.perf_counter()
+                synthetic_paper(pdf_path, pages, columns=args.columns, seed=args.seed)
+                print(f"[INFO] Generated {pdf_path.name} in {time.perf_counter() - start:.1f}s")
+            for pipeline in args.pipelines:
+                key = f"{pipeline}/{pages}p"
+                runs = [run_once(pipeline, pdf_path, args, Path(tmp) / f"{pipeline}_{pages}_{r}.json")
+                        for r in range(max(1, args.repeat))]
+                best = min(runs, key=lambda run: run["total_s"])
+                best["pages"] = pages
+                results["runs"][key] = best
+                print(format_run(key, pages, best))
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(results, indent=2), encoding="utf-8")
+            print(f"[INFO] Results written to {path}")
+
+    if baseline:
+        regressions = compare(results, baseline, args.threshold, args.min_delta)
+        if regressions:
+            print(f"[WARN] {len(regressions)} regressions over {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"[INFO] No regressions over {args.threshold:.0%} against {args.baseline}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Deterministic stand-in for the model strategies, so pipelines can be timed without models, GPU or network."""
+import hashlib
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from annotators.base import AnnotatorStrategy
+from config.labels import CATEGORY_COLORS
+from utils.batching import pack_by_token_budget
+from utils.instrumentation import TRACER
+
+# Categories that have a highlight colour, so every non-'none' answer is written
+_CATEGORIES = sorted(CATEGORY_COLORS)
+
+
+class StubStrategy(AnnotatorStrategy):
+    """
+    Labels each sentence from a hash of its text: the same sentence always
+    gets the same category, and about `highlight_ratio` of sentences get a
+    highlighted (non-'none') one. `seconds_per_sentence` simulates model
+    cost; at 0 only the pipeline around the model is measured.
+
+    Accepts the constructor arguments of ZeroShotSentence and
+    Phi3ONNXStrategy, and offers the LLM-only methods the scripts call
+    (`plan_batches`, `classify_stream`, `justify`, `report`), so it can
+    replace either class in `main_nli.py` / `main_llm.py`.
+    """
+
+    model_id = "stub"
+    prompt_version = "stub-v1"
+    HYPOTHESIS_TEMPLATE = "This sentence is about {}."
+    CONTEXT_WINDOW = 4096
+    highlight_ratio = 0.3
+    seconds_per_sentence = 0.0
+
+    def __init__(self, *args, **kwargs):
+        self.stats = {"batches": 0, "sentences": 0}
+
+    def _label(self, text: str) -> Dict:
+        digest = int(hashlib.sha1(text.encode("utf-8")).hexdigest()[:8], 16)
+        if (digest % 1000) / 1000 >= self.highlight_ratio:
+            return {"category": "none", "justification": ""}
+        category = _CATEGORIES[(digest // 1000) % len(_CATEGORIES)]
+        return {"category": category, "confidence": 0.9, "justification": f"Stub label '{category}'."}
+
+    def classify_batch(self, chunks: List[str]) -> List[Dict]:
+        with TRACER.stage("stub.classify", sentences=len(chunks)):
+            if self.seconds_per_sentence:
+                time.sleep(self.seconds_per_sentence * len(chunks))
+            self.stats["batches"] += 1
+            self.stats["sentences"] += len(chunks)
+            return [self._label(text) for text in chunks]
+
+    def plan_batches(self, texts: Sequence[str], pages: Optional[Sequence[int]] = None,
+                     token_budget: int = CONTEXT_WINDOW,
+                     max_sentences: Optional[int] = None) -> List[Tuple[int, int]]:
+        """Same packing as Phi3ONNXStrategy, with ~4 characters per token instead of a tokenizer."""
+        return pack_by_token_budget(
+            [len(t) // 4 + 1 for t in texts],
+            pages if pages is not None else [0] * len(texts),
+            budget=min(token_budget, self.CONTEXT_WINDOW),
+            fixed_cost=600,
+            per_item_cost=10,
+            max_items=max_sentences,
+        )
+
+    def classify_stream(self, batches: Iterable[List[str]],
+                        num_sequences: int = 4) -> Iterator[Tuple[int, List[Dict]]]:
+        for index, batch in enumerate(batches):
+            yield index, self.classify_batch(batch)
+
+    def justify(self, chunks: List[str], categories: List[str]) -> List[str]:
+        return [f"Stub justification for '{category}'." for category in categories]
+
+    def report(self) -> str:
+        return f"stub: {self.stats['sentences']} sentences in {self.stats['batches']} batches"
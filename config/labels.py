@@ -32,4 +32,31 @@ LABELS = [
     "innovation", "related work", "limitation", "method",
     "results", "dataset", "future_work",
     "reason", "none"
-]
\ No newline at end of file
+]
+
+# Single-letter codes for the compact LLM output mode ("1:M 2:R 3:N")
+LABEL_CODES: Dict[str, str] = {
+    "I": "innovation",
+    "W": "related_work",
+    "E": "reason",
+    "M": "method",
+    "D": "dataset",
+    "R": "results",
+    "L": "limitation",
+    "F": "future_work",
+    "N": "none",
+}
+
+# Natural-language descriptions used to build label prototypes for the
+# embedding annotator (same wording as the LLM prompt).
+LABEL_DESCRIPTIONS: Dict[str, str] = {
+    "innovation":   "novel ideas, key claims, originality, improvements",
+    "related_work": "prior work, comparisons, literature discussion",
+    "limitation":   "shortcomings, weaknesses, challenges",
+    "method":       "approaches, architectures, algorithms, or procedural descriptions",
+    "results":      "performance analysis, metrics, evaluation",
+    "dataset":      "data details, collection process, benchmarks used",
+    "future_work":  "suggestions, open directions, next steps",
+    "reason":       "explanations or conceptual reasoning",
+    "none":         "irrelevant or general statements",
+}
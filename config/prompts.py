@@ -1,3 +1,9 @@
+import hashlib
+
+# Batch templates keep every batch-specific part after this marker, so the
+# instructions before it form a constant prefix whose KV state can be reused.
+SENTENCES_MARKER = "Analyze the following"
+
 BATCH_PROMPT_TEMPLATE = """You are a scientist and research paper annotator.
 Your task is to label each sentence in the provided numbered list based on its content and contextual meaning within the batch.
 
@@ -12,17 +18,61 @@ Possible categories (aligned with highlight colors):
 - "future_work" suggestions, open directions, next steps
 - "none" → irrelevant or general statements
 
-Analyze the following {num_sentences} sentences:
-{formatted_sentences}
-
 Return a **valid JSON list** with one entry per sentence.
 Each entry must include:
+  - "id": the number of the sentence it labels.
   - "category": one of the exact labels above only.
   - "justification": a short explanation (1–2 sentences) for why that category was chosen
 
 Example format:
 [
-  {{"category": "methodology", "justification": "Describes the architecture and optimization process."}},
-  {{"category": "related_work", "justification": "Mentions previous approaches and comparison."}}
+  {{"id": 1, "category": "method", "justification": "Describes the architecture and optimization process."}},
+  {{"id": 2, "category": "related_work", "justification": "Mentions previous approaches and comparison."}}
 ]
-"""
\ No newline at end of file
+
+Analyze the following {num_sentences} sentences:
+{formatted_sentences}
+"""
+
+COMPACT_PROMPT_TEMPLATE = """You are a scientist and research paper annotator.
+Your task is to label each sentence in the provided numbered list based on its content and contextual meaning within the batch.
+
+Possible categories, each with a one-letter code:
+- I = innovation: novel ideas, key claims, originality, improvements
+- W = related_work: prior work, comparisons, literature discussion
+- E = reason: explanations or conceptual reasoning
+- M = method: approaches, architectures, algorithms, or procedural descriptions
+- D = dataset: data details, collection process, benchmarks used
+- R = results: performance analysis, metrics, evaluation
+- L = limitation: shortcomings, weaknesses, challenges
+- F = future_work: suggestions, open directions, next steps
+- N = none: irrelevant or general statements
+
+Answer with one "number:code" pair per sentence, separated by spaces, and nothing else.
+Example format:
+1:M 2:W 3:N
+
+Analyze the following {num_sentences} sentences:
+{formatted_sentences}
+"""
+
+JUSTIFICATION_PROMPT_TEMPLATE = """You are a scientist and research paper annotator.
+Each numbered sentence below has already been labelled with the category in brackets.
+
+{formatted_sentences}
+
+For each sentence, write one short line explaining why that category fits.
+Answer with exactly {num_sentences} lines in the form:
+1: <explanation>
+"""
+
+# Changes whenever the template text changes, so cached LLM results produced
+# by an older prompt are never reused.
+BATCH_PROMPT_VERSION = hashlib.sha1(BATCH_PROMPT_TEMPLATE.encode("utf-8")).hexdigest()[:12]
+
+COMPACT_PROMPT_VERSION = hashlib.sha1(COMPACT_PROMPT_TEMPLATE.encode("utf-8")).hexdigest()[:12]
+
+PROMPT_VERSIONS = {
+    "json": BATCH_PROMPT_VERSION,
+    "codes": COMPACT_PROMPT_VERSION,
+}
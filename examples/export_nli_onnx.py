@@ -0,0 +1,42 @@
+import argparse
+from pathlib import Path
+
+from annotators.nli_onnx_annotator import export_nli_onnx
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export a Hugging Face MNLI model to ONNX (and int8) for the ONNX NLI backend.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument(
+        "output_dir",
+        type=Path,
+        help="Folder to write model.onnx, model.int8.onnx, tokenizer and config to."
+    )
+    parser.add_argument(
+        "--model",
+        type=str,
+        default="MoritzLaurer/DeBERTa-v3-base-mnli-fever-anli",
+        help="Hugging Face zero-shot classification model."
+    )
+    parser.add_argument(
+        "--no-quantize",
+        action="store_true",
+        help="Skip writing the dynamically int8-quantized model."
+    )
+    parser.add_argument(
+        "--opset",
+        type=int,
+        default=17,
+        help="ONNX opset version."
+    )
+    args = parser.parse_args()
+
+    out_dir = export_nli_onnx(args.model, args.output_dir.expanduser().resolve(),
+                              quantize=not args.no_quantize, opset=args.opset)
+    print(f"[DONE] Exported to: {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import argparse
+from pathlib import Path
+
+from annotators.cascade import CascadeStrategy
+from annotators.llm_annotator import Phi3ONNXStrategy
+from annotators.nli_annotator import ZeroShotSentence
+from utils.highlighting import add_highlights
+from utils.pdf_extract import extract_and_clean_text_by_sentence
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Highlight research paper sections with zero-shot NLI, escalating uncertain sentences to Phi-3 ONNX.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+
+    parser.add_argument(
+        "pdf_path",
+        type=Path,
+        help="Path to the input PDF file."
+    )
+    parser.add_argument(
+        "onnx_folder",
+        type=Path,
+        help="Path to the ONNX model directory (e.g., .../cuda-int4-rtn-block-32/cuda/cuda-int4-rtn-block-32)"
+    )
+    parser.add_argument(
+        "-o", "--output",
+        type=Path,
+        dest="output_path",
+        help="Output PDF path. Default: <input>_annotated_cascade.pdf",
+        default=None
+    )
+    parser.add_argument(
+        "--model",
+        type=str,
+        default="MoritzLaurer/DeBERTa-v3-base-mnli-fever-anli",
+        help="Hugging Face zero-shot classification model for the cheap tier."
+    )
+    parser.add_argument(
+        "--nli-batch-size",
+        type=int,
+        default=32,
+        help="Number of (sentence, label) pairs per NLI forward pass."
+    )
+    parser.add_argument(
+        "--min-confidence",
+        type=float,
+        default=0.6,
+        help="Escalate sentences whose top NLI score is below this."
+    )
+    parser.add_argument(
+        "--min-margin",
+        type=float,
+        default=0.15,
+        help="Escalate sentences whose top-two NLI score gap is below this."
+    )
+    parser.add_argument(
+        "-b", "--batch-size",
+        type=int,
+        default=16,
+        help="Maximum number of escalated sentences per LLM batch."
+    )
+    parser.add_argument(
+        "--output-format",
+        choices=["codes", "json"],
+        default="codes",
+        help="LLM answer format, see main_llm.py."
+    )
+    parser.add_argument(
+        "--section-filter",
+        action="store_true",
+        help="Skip references/appendices, running headers/footers, front matter and boilerplate before classifying."
+    )
+    parser.add_argument(
+        "--geometry",
+        action="store_true",
+        help="Keep word positions during extraction and highlight from them instead of searching each page."
+    )
+
+    args = parser.parse_args()
+
+    # === Resolve and validate paths ===
+    pdf_path = args.pdf_path.expanduser().resolve()
+    onnx_folder = args.onnx_folder.expanduser().resolve()
+
+    if not pdf_path.exists():
+        parser.error(f"PDF not found: {pdf_path}")
+    if pdf_path.suffix.lower() != ".pdf":
+        parser.error(f"Input must be a .pdf file: {pdf_path}")
+    if not onnx_folder.exists():
+        parser.error(f"ONNX model folder not found: {onnx_folder}")
+
+    output_path = args.output_path or pdf_path.with_name(pdf_path.stem + "_annotated_cascade.pdf")
+    output_path = output_path.expanduser().resolve()
+
+    # === Pipeline ===
+    print(f"[INFO] Loading PDF: {pdf_path}")
+    chunks = extract_and_clean_text_by_sentence(
+        pdf_path, with_geometry=args.geometry, section_filter=args.section_filter
+    )
+    print(f"[INFO] Found {len(chunks)} valid sentences.")
+
+    if not chunks:
+        print("[WARN] No valid sentences found. Exiting.")
+        return
+
+    strategy = CascadeStrategy(
+        ZeroShotSentence(model_name=args.model, batch_size=args.nli_batch_size),
+        Phi3ONNXStrategy(onnx_folder, output_format=args.output_format),
+        min_confidence=args.min_confidence,
+        min_margin=args.min_margin,
+        max_batch=args.batch_size,
+    )
+
+    # Whole document at once so escalated sentences are batched with their neighbours
+    results = strategy.classify_batch([chunk[1] for chunk in chunks])
+    print(f"[INFO] {strategy.report()}")
+
+    annotations = [
+        (page_idx, text, result, *geometry)
+        for (page_idx, text, *geometry), result in zip(chunks, results)
+    ]
+
+    print(f"[INFO] Saving annotated PDF → {output_path}")
+    add_highlights(pdf_path, annotations, output_path)
+    print(f"[DONE] Saved: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import argparse
+import json
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+
+def request(server: str, path: str, payload=None, retries: int = 10, timeout: float = 3600):
+    """
+    JSON request to the annotation server; waits and resends while it
+    answers 503 (busy). Exits with a one-line error when it cannot be reached.
+    """
+    data = None if payload is None else json.dumps(payload).encode("utf-8")
+    for attempt in range(retries + 1):
+        req = urllib.request.Request(server.rstrip("/") + path, data=data,
+                                     headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            error = json.loads(e.read() or b"{}").get("error", e.reason)
+            if e.code != 503 or attempt == retries:
+                raise RuntimeError(f"Server error {e.code}: {error}") from None
+            delay = float(e.headers.get("Retry-After", 1)) * (attempt + 1)
+            print(f"[WARN] Server busy ({error}); retrying in {delay:.0f}s ...", file=sys.stderr)
+            time.sleep(delay)
+        except urllib.error.URLError as e:
+            # No server there (refused, unknown host): no later request would fare better
+            sys.exit(f"[ERROR] Cannot reach the annotation server at {server}: {e.reason}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Send PDFs or sentences to a running annotation server (see main_server.py).",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+
+    parser.add_argument(
+        "pdfs",
+        type=Path,
+        nargs="*",
+        help="PDFs to annotate."
+    )
+    parser.add_argument(
+        "--server",
+        type=str,
+        default="http://127.0.0.1:8765",
+        help="Address of main_server.py."
+    )
+    parser.add_argument(
+        "-o", "--output",
+        type=Path,
+        default=None,
+        help="Output PDF (one input only). Default: <name>_annotated.pdf next to each input."
+    )
+    parser.add_argument(
+        "--strategy",
+        type=str,
+        default=None,
+        help="Backend name on the server (e.g. nli, llm). Default: the server's first."
+    )
+    parser.add_argument(
+        "--sentences",
+        type=Path,
+        default=None,
+        help="Classify the sentences in this file (one per line, '-' for stdin) and print JSON lines."
+    )
+    parser.add_argument(
+        "--no-highlight",
+        action="store_true",
+        help="Print the annotations as JSON lines instead of writing highlighted PDFs."
+    )
+    parser.add_argument(
+        "--geometry",
+        action="store_true",
+        help="Keep word positions during extraction and highlight from them."
+    )
+    parser.add_argument(
+        "--section-filter",
+        action="store_true",
+        help="Skip references/appendices, running headers/footers, front matter and boilerplate."
+    )
+    parser.add_argument(
+        "--save-mode",
+        choices=["full", "fast", "incremental"],
+        default="full",
+        help="How the annotated PDF is written, see main_llm.py."
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=10,
+        help="Resends while the server is busy before giving up."
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Print the server's queue, batch and latency statistics."
+    )
+
+    args = parser.parse_args()
+    if not args.pdfs and args.sentences is None and not args.stats:
+        parser.error("Give PDFs, --sentences or --stats.")
+    if args.output and len(args.pdfs) != 1:
+        parser.error("-o/--output needs exactly one input PDF.")
+
+    if args.sentences is not None:
+        source = sys.stdin if str(args.sentences) == "-" else open(args.sentences, encoding="utf-8")
+        with source:
+            sentences = [line.strip() for line in source if line.strip()]
+        response = request(args.server, "/annotate/sentences",
+                           {"sentences": sentences, "strategy": args.strategy}, args.retries)
+        for sentence, result in zip(sentences, response["results"]):
+            print(json.dumps({"sentence": sentence, **result}, ensure_ascii=False))
+
+    for pdf_path in args.pdfs:
+        pdf_path = pdf_path.expanduser().resolve()
+        job = {
+            "pdf": str(pdf_path),
+            "strategy": args.strategy,
+            "geometry": args.geometry,
+            "section_filter": args.section_filter,
+            "save_mode": args.save_mode,
+        }
+        if not args.no_highlight:
+            if args.save_mode == "incremental":
+                output_path = pdf_path
+            else:
+                output_path = args.output or pdf_path.with_name(f"{pdf_path.stem}_annotated.pdf")
+            job["output"] = str(output_path.expanduser().resolve())
+        try:
+            response = request(args.server, "/annotate/pdf", job, args.retries)
+        except RuntimeError as e:
+            print(f"[ERROR] {pdf_path.name}: {e}")
+            continue
+
+        timings = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in response["timings"].items())
+        if args.no_highlight:
+            for page_idx, sentence, result in response["annotations"]:
+                print(json.dumps({"pdf": pdf_path.name, "page": page_idx + 1, "sentence": sentence, **result},
+                                 ensure_ascii=False))
+            print(f"[INFO] {pdf_path.name}: {len(response['annotations'])} sentences ({timings})", file=sys.stderr)
+        else:
+            print(f"[DONE] {pdf_path.name} → {response['output']}: {response['highlighted']} highlighted ({timings})")
+
+    if args.stats:
+        print(json.dumps(request(args.server, "/stats"), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import argparse
+from pathlib import Path
+
+from annotators.factory import build_strategy
+from utils.corpus import annotate_corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Annotate every PDF in a folder with one model load and parallel extraction/saving.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+
+    parser.add_argument(
+        "input_dir",
+        type=Path,
+        help="Folder containing the PDFs to annotate."
+    )
+    parser.add_argument(
+        "output_dir",
+        type=Path,
+        help="Folder for the annotated PDFs (<name>_annotated.pdf)."
+    )
+    parser.add_argument(
+        "--backend",
+        choices=["nli", "embedding", "llm"],
+        default="nli",
+        help="Annotation strategy, see main_nli.py and main_llm.py."
+    )
+    parser.add_argument(
+        "--onnx-folder",
+        type=Path,
+        default=None,
+        help="LLM backend: path to the Phi-3 ONNX model directory."
+    )
+    parser.add_argument(
+        "--output-format",
+        choices=["codes", "json"],
+        default="codes",
+        help="LLM backend answer format, see main_llm.py."
+    )
+    parser.add_argument(
+        "--model",
+        type=str,
+        default=None,
+        help="NLI/embedding backend: Hugging Face model override."
+    )
+    parser.add_argument(
+        "-b", "--batch-size",
+        type=int,
+        default=16,
+        help="Sentences per classify_batch call."
+    )
+    parser.add_argument(
+        "-r", "--recursive",
+        action="store_true",
+        help="Also look for PDFs in subfolders."
+    )
+    parser.add_argument(
+        "-j", "--workers",
+        type=int,
+        default=None,
+        help="Processes for extraction and highlighting. Default: CPU count - 1."
+    )
+    parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=4,
+        help="Extracted documents allowed to wait for the model (bounds memory)."
+    )
+    parser.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="Re-annotate PDFs whose output already exists and is newer than the input."
+    )
+    parser.add_argument(
+        "--checkpoint",
+        action="store_true",
+        help="Append results per batch to <output>.checkpoint.jsonl so pre-empted documents resume mid-way."
+    )
+    parser.add_argument(
+        "--section-filter",
+        action="store_true",
+        help="Skip references/appendices, running headers/footers, front matter and boilerplate before classifying."
+    )
+    parser.add_argument(
+        "--geometry",
+        action="store_true",
+        help="Keep word positions during extraction and highlight from them instead of searching each page."
+    )
+    parser.add_argument(
+        "--cache",
+        type=Path,
+        default=None,
+        help="SQLite annotation cache shared across the corpus (and with the single-file scripts)."
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=200_000,
+        help="Maximum number of cached annotations before least-recently-used eviction."
+    )
+
+    args = parser.parse_args()
+
+    input_dir = args.input_dir.expanduser().resolve()
+    output_dir = args.output_dir.expanduser().resolve()
+    if not input_dir.is_dir():
+        parser.error(f"Input folder not found: {input_dir}")
+
+    pattern = "**/*.pdf" if args.recursive else "*.pdf"
+    pdf_paths = sorted(p for p in input_dir.glob(pattern) if p.is_file())
+    # Never pick up our own outputs when writing into (or under) the input folder
+    pdf_paths = [p for p in pdf_paths if not p.stem.endswith("_annotated")]
+    if not pdf_paths:
+        print(f"[WARN] No PDFs found in {input_dir}.")
+        return
+
+    print(f"[INFO] Found {len(pdf_paths)} PDFs in {input_dir}.")
+    if args.backend == "llm" and args.onnx_folder is None:
+        parser.error("--backend llm needs --onnx-folder")
+    # Loaded once for the whole corpus
+    strategy = build_strategy(args.backend, onnx_folder=args.onnx_folder, output_format=args.output_format,
+                              model=args.model, cache=args.cache, cache_size=args.cache_size)
+
+    annotate_corpus(
+        pdf_paths,
+        output_dir,
+        strategy,
+        batch_size=max(1, args.batch_size),
+        workers=args.workers,
+        prefetch=args.prefetch,
+        with_geometry=args.geometry,
+        overwrite=args.overwrite,
+        checkpoint=args.checkpoint,
+        section_filter=args.section_filter,
+    )
+
+    if args.cache:
+        print(f"[INFO] {strategy.report()}")
+    if args.backend == "llm":
+        model = strategy.strategy if args.cache else strategy
+        print(f"[INFO] LLM recovery: {model.report()}")
+
+
+if __name__ == "__main__":
+    main()
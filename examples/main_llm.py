@@ -3,11 +3,17 @@
 import argparse
 from pathlib import Path
 
-import tqdm
+from tqdm import tqdm
 
+from annotators.cache import AnnotationCache, CachedAnnotator
 from annotators.llm_annotator import Phi3ONNXStrategy
+from config.prompts import PROMPT_VERSIONS
+from utils.checkpoint import AnnotationCheckpoint, checkpoint_path_for
 from utils.highlighting import add_highlights
+from utils.instrumentation import TRACER, finish_trace
 from utils.pdf_extract import extract_and_clean_text_by_sentence
+from utils.section_filter import first_occurrences
+from utils.streaming import annotate_streaming
 
 
 def main():
@@ -36,11 +42,97 @@ def main():
     parser.add_argument(
         "-b", "--batch-size",
         type=int,
-        default=4,
-        help="Number of sentences per LLM batch. Larger = more context, slower."
+        default=16,
+        help="Upper bound on sentences per LLM batch; batches are otherwise packed up to --token-budget."
+    )
+    parser.add_argument(
+        "--token-budget",
+        type=int,
+        default=Phi3ONNXStrategy.CONTEXT_WINDOW,
+        help="Prompt + expected output tokens per LLM call (capped at the model's context window)."
+    )
+    parser.add_argument(
+        "--parallel-sequences",
+        type=int,
+        default=1,
+        help="Decode this many batches together as one multi-sequence generation (higher throughput, more memory)."
+    )
+    parser.add_argument(
+        "--output-format",
+        choices=["codes", "json"],
+        default="codes",
+        help="'codes': one-letter labels only (few tokens per sentence). 'json': per-sentence JSON with justifications."
+    )
+    parser.add_argument(
+        "--justify",
+        action="store_true",
+        help="With --output-format codes, generate justifications afterwards for highlighted sentences only."
+    )
+    parser.add_argument(
+        "--geometry",
+        action="store_true",
+        help="Keep word positions during extraction and highlight from them instead of searching each page."
+    )
+    parser.add_argument(
+        "--save-mode",
+        choices=["full", "fast", "incremental"],
+        default="full",
+        help="'full': compressed rewrite with garbage collection. 'fast': rewrite without garbage collection. "
+             "'incremental': append the highlights to the input PDF itself (no -o), "
+             "replacing those of an earlier run."
+    )
+    parser.add_argument(
+        "--extract-workers",
+        type=int,
+        default=1,
+        help="Processes for sentence extraction (0 = one per CPU). Worth it on long PDFs; same output as 1. "
+             "Not with --geometry, --section-filter or --stream."
+    )
+    parser.add_argument(
+        "--join-pages",
+        action="store_true",
+        help="Merge sentences cut by a page break into one (highlighted on both pages). --geometry always does."
+    )
+    parser.add_argument(
+        "--section-filter",
+        action="store_true",
+        help="Skip references/appendices, running headers/footers, front matter and boilerplate before classifying."
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Extract, classify and highlight page by page with one open document (bounded memory on long PDFs). "
+             "Uses fixed batches of -b sentences instead of token-budget packing."
+    )
+    parser.add_argument(
+        "--checkpoint",
+        action="store_true",
+        help="Append results after every batch to <output>.checkpoint.jsonl and resume from it. "
+             "On a revised PDF only sentences whose text changed are classified again."
+    )
+    parser.add_argument(
+        "--cache",
+        type=Path,
+        default=None,
+        help="SQLite annotation cache. Sentences already classified by the same model/prompt skip inference."
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=200_000,
+        help="Maximum number of cached annotations before least-recently-used eviction."
+    )
+
+    parser.add_argument(
+        "--trace",
+        type=Path,
+        default=None,
+        help="Record per-stage wall/CPU time, token counts and peak RSS; .json writes a Chrome trace, anything else JSON lines."
     )
 
     args = parser.parse_args()
+    if args.trace:
+        TRACER.enable()
 
     # === Resolve and validate paths ===
     pdf_path = args.pdf_path.expanduser().resolve()
@@ -54,31 +146,136 @@ def main():
     if not onnx_folder.exists():
         parser.error(f"ONNX model folder not found: {onnx_folder}")
 
+    if args.stream and args.geometry:
+        parser.error("--stream places highlights by text search; it cannot be combined with --geometry")
+    if args.stream and args.checkpoint:
+        parser.error("--checkpoint is not supported with --stream")
+    if args.stream and args.justify:
+        parser.error("--justify is not supported with --stream")
+    if args.stream and args.parallel_sequences > 1:
+        parser.error("--stream classifies one batch at a time; it cannot be combined with --parallel-sequences")
+    if args.stream and args.token_budget != parser.get_default("token_budget"):
+        parser.error("--stream uses fixed batches of -b sentences; it cannot be combined with --token-budget")
+    if args.extract_workers < 0:
+        parser.error("--extract-workers must be 0 (one per CPU) or a positive number of processes")
+    if args.extract_workers != 1 and (args.geometry or args.section_filter or args.stream):
+        parser.error("--extract-workers splits plain-text extraction; it cannot be combined with "
+                     "--geometry, --section-filter or --stream")
+    if args.join_pages and (args.geometry or args.section_filter or args.stream):
+        parser.error("--join-pages applies to plain-text extraction (--geometry always joins pages); "
+                     "it cannot be combined with --geometry, --section-filter or --stream")
+
     # Default output: input file + "_annotated_llm.pdf"
     output_path = args.output_path or pdf_path.with_name(pdf_path.stem + "_annotated_llm.pdf")
     output_path = output_path.expanduser().resolve()
+    if args.save_mode == "incremental":
+        # Written in place: the annotations are appended to the input file
+        if args.output_path and output_path != pdf_path:
+            parser.error("--save-mode incremental writes into the input PDF; drop -o")
+        output_path = pdf_path
 
     # === Pipeline ===
-    llm_strategy = Phi3ONNXStrategy(onnx_folder)
+    def load_model():
+        return Phi3ONNXStrategy(onnx_folder, output_format=args.output_format)
+
+    if args.cache:
+        # Model is only loaded if some sentence is not cached yet
+        llm_strategy = CachedAnnotator(
+            load_model,
+            AnnotationCache(args.cache, args.cache_size),
+            model_id=str(onnx_folder),
+            prompt_version=PROMPT_VERSIONS[args.output_format],
+        )
+    else:
+        # Loaded once a sentence needs it, so a fully checkpointed run skips it
+        llm_strategy = None
+
+    if args.stream:
+        if llm_strategy is None:
+            llm_strategy = load_model()
+        batch_size = max(1, args.batch_size)
+        print(f"[INFO] Streaming {pdf_path} → {output_path} in batches of {batch_size}...")
+        stream = annotate_streaming(pdf_path, output_path, llm_strategy, batch_size=batch_size,
+                                    section_filter=args.section_filter, save_mode=args.save_mode)
+        count = sum(1 for _ in tqdm(stream, desc="Sentences", unit="sent"))
+        if args.cache:
+            print(f"[INFO] {llm_strategy.report()}")
+        print(f"[DONE] {count} sentences annotated, saved: {output_path}")
+        finish_trace(args.trace)
+        return
 
     print(f"[INFO] Loading PDF: {pdf_path}")
-    chunks = extract_and_clean_text_by_sentence(pdf_path)
+    chunks = extract_and_clean_text_by_sentence(
+        pdf_path, with_geometry=args.geometry, section_filter=args.section_filter,
+        workers=args.extract_workers or None, join_pages=args.join_pages,
+    )
     print(f"[INFO] Found {len(chunks)} valid sentences.")
 
     if not chunks:
         print("[WARN] No valid sentences found. Exiting.")
         return
 
-    annotations = []
+    texts = [chunk[1] for chunk in chunks]
+    pages = [chunk[0] for chunk in chunks]
     batch_size = max(1, args.batch_size)  # Ensure at least 1
 
-    print(f"[INFO] Classifying in batches of {batch_size}...")
-    for i in tqdm(range(0, len(chunks), batch_size), desc="LLM Batches"):
-        batch = chunks[i:i + batch_size]
-        batch_pages, batch_texts = zip(*batch)
+    results = [None] * len(chunks)
+    checkpoint = None
+    if args.checkpoint:
+        # Resume an interrupted run, or reuse unchanged sentences of an earlier revision
+        checkpoint = AnnotationCheckpoint(
+            checkpoint_path_for(output_path),
+            model_id=str(onnx_folder),
+            prompt_version=PROMPT_VERSIONS[args.output_format],
+        )
+        results = checkpoint.lookup(pages, texts)
+        print(f"[INFO] {checkpoint.report()}")
+
+    if args.cache:
+        # Cached sentences never reach the model (nor trigger loading it)
+        missing = [i for i, result in enumerate(results) if result is None]
+        for i, result in zip(missing, llm_strategy.lookup([texts[i] for i in missing])):
+            results[i] = result
+    todo = [i for i, result in enumerate(results) if result is None]
+    # Identical sentences are classified once and share the result
+    todo, duplicates = first_occurrences(texts, todo)
+    if duplicates:
+        print(f"[INFO] {len(duplicates)} repeated sentences will reuse the first occurrence's label.")
+
+    ranges = []
+    if todo:
+        if llm_strategy is None:
+            llm_strategy = load_model()
+        model = llm_strategy.strategy if args.cache else llm_strategy
+        ranges = model.plan_batches(
+            [texts[i] for i in todo],
+            [pages[i] for i in todo],
+            token_budget=args.token_budget,
+            max_sentences=batch_size,
+        )
+        print(f"[INFO] Classifying {len(todo)} sentences in {len(ranges)} token-budget batches...")
+
+    batch_indices = [todo[start:end] for start, end in ranges]
+
+    if args.parallel_sequences > 1 and batch_indices:
+        # Several batches decoded together as one multi-sequence generation
+        queue = ([texts[i] for i in batch_idx] for batch_idx in batch_indices)
+        stream = model.classify_stream(queue, num_sequences=args.parallel_sequences)
+        for b, batch_results in tqdm(stream, total=len(batch_indices), desc="LLM Batches"):
+            batch_idx = batch_indices[b]
+            if args.cache:
+                llm_strategy.store([texts[i] for i in batch_idx], batch_results)
+            if checkpoint is not None:
+                checkpoint.append([pages[i] for i in batch_idx], [texts[i] for i in batch_idx], batch_results)
+            for i, result in zip(batch_idx, batch_results):
+                results[i] = result
+        batch_indices = []
+
+    for batch_idx in tqdm(batch_indices, desc="LLM Batches"):
+        batch_texts = [texts[i] for i in batch_idx]
 
         try:
-            batch_results = llm_strategy.classify_batch(list(batch_texts))
+            batch_results = llm_strategy.classify_batch(batch_texts)
         except Exception as e:
             print(f"[ERROR] Batch failed: {e}. Using 'none' fallback.")
             batch_results = [
@@ -88,12 +285,60 @@ def main():
 
         if len(batch_results) != len(batch_texts):
             print(f"[WARN] Result mismatch: {len(batch_results)} vs {len(batch_texts)}. Padding with 'none'.")
-            fallback = {"category": "none", "justification": "Result count mismatch."}
+            fallback = {"category": "none", "justification": "Error: result count mismatch."}
             batch_results = (batch_results + [fallback] * len(batch_texts))[:len(batch_texts)]
 
-        for page_idx, text, result in zip(batch_pages, batch_texts, batch_results):
-            annotations.append((page_idx, text, result))
+        if checkpoint is not None:
+            checkpoint.append([pages[i] for i in batch_idx], batch_texts, batch_results)
+        for i, result in zip(batch_idx, batch_results):
+            results[i] = result
+
+    if todo:
+        print(f"[INFO] LLM recovery: {model.report()}")
+
+    # Lazy justifications: only for sentences that will actually be highlighted
+    if args.justify and args.output_format == "codes":
+        pending = [
+            i for i, result in enumerate(results)
+            if result.get("category", "none") != "none" and not result.get("justification")
+        ]
+        if pending:
+            if llm_strategy is None:
+                llm_strategy = load_model()
+            model = llm_strategy.strategy if args.cache else llm_strategy
+            print(f"[INFO] Generating justifications for {len(pending)} highlighted sentences...")
+            for start in tqdm(range(0, len(pending), batch_size), desc="Justifications"):
+                batch_idx = pending[start:start + batch_size]
+                reasons = model.justify(
+                    [texts[i] for i in batch_idx],
+                    [results[i]["category"] for i in batch_idx],
+                )
+                for i, reason in zip(batch_idx, reasons):
+                    if reason:
+                        results[i] = {**results[i], "justification": reason}
+
+    for i, first in duplicates.items():
+        results[i] = results[first]
+
+    if checkpoint is not None:
+        # Keep exactly this revision's results (with any new justifications)
+        checkpoint.compact(pages, texts, results)
+
+    # Keep any extracted geometry alongside the result
+    annotations = [
+        (page_idx, text, result, *geometry)
+        for (page_idx, text, *geometry), result in zip(chunks, results)
+    ]
+
+    if args.cache:
+        print(f"[INFO] {llm_strategy.report()}")
 
     print(f"[INFO] Saving annotated PDF → {output_path}")
-    add_highlights(pdf_path, annotations, output_path)
-    print(f"[DONE] Saved: {output_path}")
\ No newline at end of file
+    writer = add_highlights(pdf_path, annotations, output_path, save_mode=args.save_mode)
+    print(f"[INFO] {writer.report()}")
+    print(f"[DONE] Saved: {output_path}")
+    finish_trace(args.trace)
+
+
+if __name__ == "__main__":
+    main()
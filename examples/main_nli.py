@@ -1,11 +1,17 @@
 import argparse
+import json
 from pathlib import Path
 
-import tqdm
+from tqdm import tqdm
 
+from annotators.cache import AnnotationCache, CachedAnnotator
+from annotators.embedding_annotator import EmbeddingPrototypeStrategy
 from annotators.nli_annotator import ZeroShotSentence
 from utils.highlighting import add_highlights
+from utils.instrumentation import TRACER, finish_trace
 from utils.pdf_extract import extract_and_clean_text_by_sentence
+from utils.section_filter import first_occurrences
+from utils.streaming import annotate_streaming
 
 def main():
     parser = argparse.ArgumentParser(
@@ -29,16 +35,112 @@ def main():
         "-b", "--batch-size",
         type=int,
         default=32,
-        help="Number of sentences per zero-shot batch. Larger = faster, less memory per call."
+        help="NLI: (sentence, label) pairs per forward pass. Embedding: sentences per encoder pass."
+    )
+    parser.add_argument(
+        "--backend",
+        choices=["nli", "onnx", "embedding"],
+        default="nli",
+        help="'nli': zero-shot NLI, one pass per label. 'onnx': the same NLI model exported with "
+             "export_nli_onnx.py, run by onnxruntime. 'embedding': one sentence-embedding pass "
+             "compared against label prototypes (much faster on CPU)."
+    )
+    parser.add_argument(
+        "--onnx-dir",
+        type=Path,
+        default=None,
+        help="ONNX backend: folder written by examples/export_nli_onnx.py."
+    )
+    parser.add_argument(
+        "--precision",
+        choices=["auto", "fp32", "int8"],
+        default="auto",
+        help="ONNX backend: 'fp32' runs model.onnx (on CUDA when available), 'int8' runs model.int8.onnx on CPU. "
+             "'auto': fp32 when onnxruntime has CUDA, int8 otherwise."
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=0,
+        help="ONNX backend: intra-op threads (0 = onnxruntime default)."
+    )
+    parser.add_argument(
+        "--inter-op-threads",
+        type=int,
+        default=0,
+        help="ONNX backend: inter-op threads (0 = onnxruntime default)."
     )
     parser.add_argument(
         "--model",
         type=str,
-        default="MoritzLaurer/DeBERTa-v3-base-mnli-fever-anli",
-        help="Hugging Face zero-shot classification model."
+        default=None,
+        help="Hugging Face model. Default: MoritzLaurer/DeBERTa-v3-base-mnli-fever-anli (nli), "
+             "sentence-transformers/all-MiniLM-L6-v2 (embedding)."
+    )
+    parser.add_argument(
+        "--seeds",
+        type=Path,
+        default=None,
+        help="Embedding backend: JSON file mapping category → example sentences, added to the label prototypes."
+    )
+    parser.add_argument(
+        "--geometry",
+        action="store_true",
+        help="Keep word positions during extraction and highlight from them instead of searching each page."
+    )
+    parser.add_argument(
+        "--save-mode",
+        choices=["full", "fast", "incremental"],
+        default="full",
+        help="'full': compressed rewrite with garbage collection. 'fast': rewrite without garbage collection. "
+             "'incremental': append the highlights to the input PDF itself (no -o), "
+             "replacing those of an earlier run."
+    )
+    parser.add_argument(
+        "--extract-workers",
+        type=int,
+        default=1,
+        help="Processes for sentence extraction (0 = one per CPU). Worth it on long PDFs; same output as 1. "
+             "Not with --geometry, --section-filter or --stream."
+    )
+    parser.add_argument(
+        "--join-pages",
+        action="store_true",
+        help="Merge sentences cut by a page break into one (highlighted on both pages). --geometry always does."
+    )
+    parser.add_argument(
+        "--section-filter",
+        action="store_true",
+        help="Skip references/appendices, running headers/footers, front matter and boilerplate before classifying."
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Extract, classify and highlight page by page with one open document (bounded memory on long PDFs)."
+    )
+    parser.add_argument(
+        "--cache",
+        type=Path,
+        default=None,
+        help="SQLite annotation cache. Sentences already classified by the same model/prompt skip inference."
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=200_000,
+        help="Maximum number of cached annotations before least-recently-used eviction."
+    )
+
+    parser.add_argument(
+        "--trace",
+        type=Path,
+        default=None,
+        help="Record per-stage wall/CPU time, token counts and peak RSS; .json writes a Chrome trace, anything else JSON lines."
     )
 
     args = parser.parse_args()
+    if args.trace:
+        TRACER.enable()
 
     # === Resolve and validate paths ===
     pdf_path = args.pdf_path.expanduser().resolve()
@@ -48,30 +150,104 @@ def main():
     if pdf_path.suffix.lower() != ".pdf":
         parser.error(f"Input must be a .pdf file: {pdf_path}")
 
+    if args.stream and args.geometry:
+        parser.error("--stream places highlights by text search; it cannot be combined with --geometry")
+    if args.extract_workers < 0:
+        parser.error("--extract-workers must be 0 (one per CPU) or a positive number of processes")
+    if args.extract_workers != 1 and (args.geometry or args.section_filter or args.stream):
+        parser.error("--extract-workers splits plain-text extraction; it cannot be combined with "
+                     "--geometry, --section-filter or --stream")
+    if args.join_pages and (args.geometry or args.section_filter or args.stream):
+        parser.error("--join-pages applies to plain-text extraction (--geometry always joins pages); "
+                     "it cannot be combined with --geometry, --section-filter or --stream")
+
     # Default output
     output_path = args.output_path or pdf_path.with_name(pdf_path.stem + "_sentence_annotated.pdf")
     output_path = output_path.expanduser().resolve()
+    if args.save_mode == "incremental":
+        # Written in place: the annotations are appended to the input file
+        if args.output_path and output_path != pdf_path:
+            parser.error("--save-mode incremental writes into the input PDF; drop -o")
+        output_path = pdf_path
 
     # === Pipeline ===
+    batch_size = max(1, args.batch_size)
+    # Initialize strategy with optional model override
+    if args.backend == "onnx":
+        if args.onnx_dir is None:
+            parser.error("--backend onnx needs --onnx-dir (see examples/export_nli_onnx.py)")
+        # Imported here so the other backends do not need onnxruntime installed
+        from annotators.nli_onnx_annotator import ONNX_INT8_FILE, ZeroShotONNXSentence, onnx_model_path
+        onnx_dir = args.onnx_dir.expanduser().resolve()
+        # Resolved before loading, so the cache key names the graph that will run
+        onnx_path = onnx_model_path(onnx_dir, {"auto": None, "fp32": False, "int8": True}[args.precision])
+        model_name = str(onnx_path)
+        build = lambda: ZeroShotONNXSentence(
+            onnx_dir,
+            quantized=onnx_path.name == ONNX_INT8_FILE,
+            batch_size=batch_size,
+            intra_op_threads=args.threads,
+            inter_op_threads=args.inter_op_threads,
+        )
+        prompt_version = ZeroShotSentence.HYPOTHESIS_TEMPLATE
+    elif args.backend == "embedding":
+        model_name = args.model or "sentence-transformers/all-MiniLM-L6-v2"
+        seeds = json.loads(args.seeds.read_text(encoding="utf-8")) if args.seeds else None
+        build = lambda: EmbeddingPrototypeStrategy(model_name, seed_examples=seeds, batch_size=batch_size)
+        prompt_version = EmbeddingPrototypeStrategy.source_version(seeds)
+    else:
+        model_name = args.model or "MoritzLaurer/DeBERTa-v3-base-mnli-fever-anli"
+        build = lambda: ZeroShotSentence(model_name=model_name, batch_size=batch_size)
+        prompt_version = ZeroShotSentence.HYPOTHESIS_TEMPLATE
+
+    if args.cache:
+        # Model is only loaded if some sentence is not cached yet
+        strategy = CachedAnnotator(
+            build,
+            AnnotationCache(args.cache, args.cache_size),
+            model_id=model_name,
+            prompt_version=prompt_version,
+        )
+    else:
+        strategy = build()
+
+    if args.stream:
+        print(f"[INFO] Streaming {pdf_path} → {output_path} in batches of {batch_size}...")
+        stream = annotate_streaming(pdf_path, output_path, strategy, batch_size=batch_size,
+                                    section_filter=args.section_filter, save_mode=args.save_mode)
+        count = sum(1 for _ in tqdm(stream, desc="Sentences", unit="sent"))
+        if args.cache:
+            print(f"[INFO] {strategy.report()}")
+        print(f"[SUCCESS] {count} sentences annotated, saved to: {output_path}")
+        finish_trace(args.trace)
+        return
+
     print(f"[INFO] Loading PDF: {pdf_path}")
-    page_sentence_tuples = extract_and_clean_text_by_sentence(pdf_path)
-    sentences = [sent for _page_idx, sent in page_sentence_tuples]
+    page_sentence_tuples = extract_and_clean_text_by_sentence(
+        pdf_path, with_geometry=args.geometry, section_filter=args.section_filter,
+        workers=args.extract_workers or None, join_pages=args.join_pages,
+    )
+    sentences = [chunk[1] for chunk in page_sentence_tuples]
 
     if not sentences:
         print("[WARN] No valid sentences found in the PDF.")
         return
 
-    print(f"[INFO] Found {len(sentences)} valid sentences. Starting zero-shot classification...")
+    print(f"[INFO] Found {len(sentences)} valid sentences. Starting {args.backend} classification...")
 
-    # Initialize strategy with optional model override
-    strategy = ZeroShotSentence(model_name=args.model)
+    # Identical sentences are classified once and share the result
+    unique, duplicates = first_occurrences(sentences, list(range(len(sentences))))
+    if duplicates:
+        print(f"[INFO] {len(duplicates)} repeated sentences will reuse the first occurrence's label.")
+    results = [None] * len(sentences)
 
-    batch_size = max(1, args.batch_size)
-    annotations = []
-
-    print(f"[INFO] Classifying in batches of {batch_size}...")
-    for i in tqdm(range(0, len(sentences), batch_size), desc="NLI Batches"):
-        batch_sentences = sentences[i:i + batch_size]
+    # The embedding strategy splits its encoder passes itself and scores all
+    # sentences against the prototypes at once, so it gets them in one call
+    step = max(len(unique), 1) if args.backend == "embedding" else batch_size
+    print(f"[INFO] Classifying in batches of {step}...")
+    for start in tqdm(range(0, len(unique), step), desc="NLI Batches"):
+        batch_idx = unique[start:start + step]
+        batch_sentences = [sentences[i] for i in batch_idx]
         batch_results = strategy.classify_batch(batch_sentences)
 
         # Safety: align lengths
@@ -80,11 +256,27 @@ def main():
             fallback = {"category": "none", "confidence": 0.0, "justification": "Batch mismatch."}
             batch_results = (batch_results + [fallback] * len(batch_sentences))[:len(batch_sentences)]
 
-        # Reattach page numbers
-        batch_page_tuples = page_sentence_tuples[i:i + batch_size]
-        for (page_idx, sent), ann in zip(batch_page_tuples, batch_results):
-            annotations.append((page_idx, sent, ann))
+        for i, ann in zip(batch_idx, batch_results):
+            results[i] = ann
+
+    for i, first in duplicates.items():
+        results[i] = results[first]
+
+    # Reattach page numbers
+    annotations = [
+        (page_idx, sent, ann, *geometry)
+        for (page_idx, sent, *geometry), ann in zip(page_sentence_tuples, results)
+    ]
+
+    if args.cache:
+        print(f"[INFO] {strategy.report()}")
 
     print(f"[INFO] Saving annotated PDF → {output_path}")
-    add_highlights(pdf_path, annotations, output_path)
-    print(f"[SUCCESS] Annotated PDF saved to: {output_path}")
\ No newline at end of file
+    writer = add_highlights(pdf_path, annotations, output_path, save_mode=args.save_mode)
+    print(f"[INFO] {writer.report()}")
+    print(f"[SUCCESS] Annotated PDF saved to: {output_path}")
+    finish_trace(args.trace)
+
+
+if __name__ == "__main__":
+    main()
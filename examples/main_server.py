@@ -0,0 +1,143 @@
+import argparse
+from pathlib import Path
+
+from annotators.factory import build_strategy
+from utils.server import AnnotationService, BatchCoalescer, make_server
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Keep annotation models loaded and serve jobs over localhost HTTP (see main_client.py).",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+
+    parser.add_argument(
+        "--backend",
+        choices=["nli", "embedding", "llm"],
+        action="append",
+        default=None,
+        help="Strategy to load; repeat to serve several (the first is the default). Default: nli."
+    )
+    parser.add_argument(
+        "--onnx-folder",
+        type=Path,
+        default=None,
+        help="LLM backend: path to the Phi-3 ONNX model directory."
+    )
+    parser.add_argument(
+        "--output-format",
+        choices=["codes", "json"],
+        default="codes",
+        help="LLM backend answer format, see main_llm.py."
+    )
+    parser.add_argument(
+        "--token-budget",
+        type=int,
+        default=None,
+        help="LLM backend: prompt + expected output tokens per LLM call. Default: the model's context window."
+    )
+    parser.add_argument(
+        "--parallel-sequences",
+        type=int,
+        default=1,
+        help="LLM backend: decode this many token-budget batches together, see main_llm.py."
+    )
+    parser.add_argument(
+        "--nli-model",
+        type=str,
+        default=None,
+        help="NLI backend: Hugging Face model override."
+    )
+    parser.add_argument(
+        "--embedding-model",
+        type=str,
+        default=None,
+        help="Embedding backend: Hugging Face model override."
+    )
+    parser.add_argument(
+        "--host",
+        type=str,
+        default="127.0.0.1",
+        help="Address to bind. Jobs name files on this machine, so keep it local."
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8765,
+        help="Port to listen on."
+    )
+    parser.add_argument(
+        "-b", "--batch-size",
+        type=int,
+        default=16,
+        help="Sentences per batch, filled from all running jobs. The LLM backend packs each batch "
+             "into --token-budget prompts, so give it a larger -b (e.g. 64)."
+    )
+    parser.add_argument(
+        "--max-wait-ms",
+        type=float,
+        default=20.0,
+        help="How long a partial batch waits for sentences from other jobs."
+    )
+    parser.add_argument(
+        "--max-pending",
+        type=int,
+        default=4096,
+        help="Queued sentences per strategy before new jobs are refused (HTTP 503)."
+    )
+    parser.add_argument(
+        "--max-jobs",
+        type=int,
+        default=32,
+        help="Jobs handled at once before new ones are refused (HTTP 503)."
+    )
+    parser.add_argument(
+        "--cache",
+        type=Path,
+        default=None,
+        help="SQLite annotation cache shared by all jobs (and with the other scripts)."
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=200_000,
+        help="Maximum number of cached annotations before least-recently-used eviction."
+    )
+
+    args = parser.parse_args()
+    backends = list(dict.fromkeys(args.backend or ["nli"]))
+
+    if "llm" in backends and args.onnx_folder is None:
+        parser.error("--backend llm needs --onnx-folder")
+
+    # Each backend gets its own model option
+    models = {"nli": args.nli_model, "embedding": args.embedding_model, "llm": None}
+    coalescers = {}
+    for backend in backends:
+        strategy = build_strategy(backend, onnx_folder=args.onnx_folder, output_format=args.output_format,
+                                  model=models[backend], cache=args.cache, cache_size=args.cache_size)
+        coalescers[backend] = BatchCoalescer(
+            strategy,
+            batch_size=args.batch_size,
+            max_wait=args.max_wait_ms / 1000,
+            max_pending=args.max_pending,
+            token_budget=args.token_budget,
+            parallel_sequences=args.parallel_sequences,
+        )
+    service = AnnotationService(coalescers, max_jobs=args.max_jobs)
+    server = make_server(service, args.host, args.port)
+
+    print(f"[INFO] Serving {', '.join(backends)} on http://{args.host}:{args.port} (Ctrl+C to stop).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[INFO] Shutting down ...")
+    finally:
+        server.server_close()
+        service.close()
+        stats = service.report()["jobs"]
+        print(f"[DONE] {stats['done']} jobs served, {stats['failed']} failed, {stats['rejected']} refused.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+from typing import List, Optional, Sequence, Tuple
+
+# ==========================================================
+# Token-budget batch packing
+# ==========================================================
+def pack_by_token_budget(
+    token_counts: Sequence[int],
+    pages: Sequence[int],
+    budget: int,
+    fixed_cost: int,
+    per_item_cost: int,
+    max_items: Optional[int] = None,
+    max_page_gap: int = 1,
+) -> List[Tuple[int, int]]:
+    """
+    Greedily packs consecutive items into batches whose estimated cost
+    (`fixed_cost` + sum of `token_counts[i] + per_item_cost`) stays within
+    `budget`. Order is preserved, and a batch is closed early when it would
+    jump more than `max_page_gap` pages, so every batch reads as contiguous
+    context. Greedy packing of a fixed sequence gives the fewest batches.
+
+    Returns (start, end) index ranges, end exclusive. An item that alone
+    exceeds the budget gets a batch of its own.
+    """
+    batches = []
+    start, used = 0, fixed_cost
+    for i, count in enumerate(token_counts):
+        cost = count + per_item_cost
+        if i > start:
+            full = used + cost > budget
+            capped = max_items is not None and i - start >= max_items
+            gap = pages[i] - pages[i - 1] > max_page_gap
+            if full or capped or gap:
+                batches.append((start, i))
+                start, used = i, fixed_cost
+        used += cost
+    if start < len(token_counts):
+        batches.append((start, len(token_counts)))
+    return batches
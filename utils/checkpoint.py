@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# ==========================================================
+# Per-document checkpoint – append-only JSONL sidecar
+# ==========================================================
+class AnnotationCheckpoint:
+    """
+    Results of one document, appended after every batch so an interrupted
+    run can resume where it stopped.
+
+    The first line is a header with the model and prompt identity; every
+    further line is {"page": p, "hash": h, "result": {...}}. Entries are
+    matched by (page, sentence hash) first and by hash alone second, so a
+    revised paper only re-classifies the sentences whose text changed.
+    A checkpoint written for another model or prompt is ignored and
+    overwritten on the first append.
+    """
+
+    def __init__(self, path: Path, model_id: str, prompt_version: str):
+        self.path = Path(path)
+        self.header = {"model_id": model_id, "prompt_version": prompt_version}
+        self.by_key: Dict[Tuple[int, str], Dict] = {}
+        self.by_hash: Dict[str, Dict] = {}
+        self.resumed = 0
+        self._valid = False    # file exists and belongs to this model/prompt
+        self._torn = False     # file ends in a partial line
+        self._file = None
+        self._load()
+
+    @staticmethod
+    def sentence_hash(text: str) -> str:
+        # Whitespace-insensitive, so re-extraction of an unchanged sentence still matches
+        return hashlib.sha1(" ".join(text.split()).encode("utf-8")).hexdigest()[:16]
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        with open(self.path, encoding="utf-8") as f:
+            lines = f.readlines()
+        try:
+            header = json.loads(lines[0]) if lines else None
+        except json.JSONDecodeError:
+            header = None
+        if header != self.header:
+            print(f"[WARN] Checkpoint {self.path} was written by another model or prompt; starting over.")
+            return
+        self._valid = True
+        self._torn = not lines[-1].endswith("\n")
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue    # last line cut short by a crash mid-write
+            self._remember(entry["page"], entry["hash"], entry["result"])
+
+    def _remember(self, page_idx: int, sentence_hash: str, result: Dict):
+        self.by_key[(page_idx, sentence_hash)] = result
+        self.by_hash[sentence_hash] = result
+
+    def __len__(self) -> int:
+        return len(self.by_key)
+
+    def lookup(self, pages: List[int], texts: List[str]) -> List[Optional[Dict]]:
+        """Stored result per sentence, or None when it still has to be classified."""
+        found = []
+        for page_idx, text in zip(pages, texts):
+            h = self.sentence_hash(text)
+            found.append(self.by_key.get((page_idx, h)) or self.by_hash.get(h))
+        self.resumed += sum(r is not None for r in found)
+        return found
+
+    def _lines(self, pages: List[int], texts: List[str], results: List[Dict]) -> List[str]:
+        lines = []
+        for page_idx, text, result in zip(pages, texts, results):
+            # Error fallbacks are not kept, they should be retried on resume
+            if str(result.get("justification", "")).startswith("Error:"):
+                continue
+            h = self.sentence_hash(text)
+            self._remember(page_idx, h, result)
+            lines.append(json.dumps({"page": page_idx, "hash": h, "result": result}, ensure_ascii=False) + "\n")
+        return lines
+
+    def append(self, pages: List[int], texts: List[str], results: List[Dict]):
+        """Adds one batch and forces it to disk before returning."""
+        if self._file is None:
+            self._file = open(self.path, "a" if self._valid else "w", encoding="utf-8")
+            if not self._valid:
+                self._file.write(json.dumps(self.header) + "\n")
+                self._valid = True
+            elif self._torn:
+                # Terminate the half-written line so the next entry starts cleanly
+                self._file.write("\n")
+                self._torn = False
+        self._file.writelines(self._lines(pages, texts, results))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def compact(self, pages: List[int], texts: List[str], results: List[Dict]):
+        """Rewrites the checkpoint with exactly the current document's results (drops stale revisions)."""
+        self.close()
+        self.by_key, self.by_hash = {}, {}
+        partial = self.path.with_name(self.path.name + ".part")
+        with open(partial, "w", encoding="utf-8") as f:
+            f.write(json.dumps(self.header) + "\n")
+            f.writelines(self._lines(pages, texts, results))
+        os.replace(partial, self.path)
+        self._valid, self._torn = True, False
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def report(self) -> str:
+        return f"checkpoint {self.path.name}: {self.resumed} sentences resumed, {len(self)} stored"
+
+
+def checkpoint_path_for(output_path: Path) -> Path:
+    """Sidecar next to the annotated PDF."""
+    return output_path.with_name(output_path.name + ".checkpoint.jsonl")
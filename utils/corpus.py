@@ -0,0 +1,226 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from annotators.base import AnnotatorStrategy
+from utils.checkpoint import AnnotationCheckpoint, checkpoint_path_for
+from utils.highlighting import add_highlights
+from utils.pdf_extract import extract_and_clean_text_by_sentence
+from utils.section_filter import first_occurrences
+
+# ==========================================================
+# Corpus mode: many PDFs, one model load
+# ==========================================================
+@dataclass
+class FileReport:
+    pdf_path: Path
+    output_path: Path
+    sentences: int = 0
+    extract_s: float = 0.0
+    infer_s: float = 0.0
+    write_s: float = 0.0
+    error: Optional[str] = None
+
+    def line(self) -> str:
+        if self.error:
+            return f"[ERROR] {self.pdf_path.name}: {self.error}"
+        rate = self.sentences / self.infer_s if self.infer_s else 0.0
+        return (
+            f"[INFO] {self.pdf_path.name}: {self.sentences} sentences, "
+            f"extract {self.extract_s:.1f}s, infer {self.infer_s:.1f}s ({rate:.1f} sent/s), "
+            f"write {self.write_s:.1f}s"
+        )
+
+
+def output_path_for(pdf_path: Path, output_dir: Path, suffix: str) -> Path:
+    return output_dir / (pdf_path.stem + suffix + ".pdf")
+
+
+def is_done(pdf_path: Path, output_path: Path) -> bool:
+    """An output newer than its input is a finished run (outputs are renamed into place)."""
+    return output_path.exists() and output_path.stat().st_mtime >= pdf_path.stat().st_mtime
+
+
+# Worker-side jobs. Top-level functions so they pickle into the process pool.
+def _extract_job(pdf_path: Path, with_geometry: bool, section_filter: bool) -> Tuple[list, float]:
+    start = time.perf_counter()
+    chunks = extract_and_clean_text_by_sentence(pdf_path, with_geometry=with_geometry,
+                                                section_filter=section_filter)
+    return chunks, time.perf_counter() - start
+
+
+def _highlight_job(pdf_path: Path, annotations: List[Tuple], output_path: Path) -> float:
+    start = time.perf_counter()
+    # Write next to the target and rename, so an interrupted save never looks finished
+    partial = output_path.with_name(output_path.name + ".part")
+    add_highlights(pdf_path, annotations, partial)
+    os.replace(partial, output_path)
+    return time.perf_counter() - start
+
+
+def _classify_with_checkpoint(strategy: AnnotatorStrategy, pages: List[int], texts: List[str],
+                              batch_size: int, output_path: Path) -> List[Dict]:
+    ckpt = AnnotationCheckpoint(checkpoint_path_for(output_path), strategy.model_id, strategy.prompt_version)
+    results = ckpt.lookup(pages, texts)
+    todo = [i for i, result in enumerate(results) if result is None]
+    for start in range(0, len(todo), batch_size):
+        batch_idx = todo[start:start + batch_size]
+        batch_texts = [texts[i] for i in batch_idx]
+        batch_results = classify_document(strategy, batch_texts, batch_size)
+        ckpt.append([pages[i] for i in batch_idx], batch_texts, batch_results)
+        for i, result in zip(batch_idx, batch_results):
+            results[i] = result
+    ckpt.compact(pages, texts, results)
+    return results
+
+
+def classify_document(strategy: AnnotatorStrategy, texts: List[str], batch_size: int) -> List[Dict]:
+    """classify_batch over one document in slices of `batch_size`, padded like the single-file scripts."""
+    results = []
+    for start in range(0, len(texts), batch_size):
+        batch = texts[start:start + batch_size]
+        try:
+            batch_results = strategy.classify_batch(batch)
+        except Exception as e:
+            print(f"[ERROR] Batch failed: {e}. Using 'none' fallback.")
+            batch_results = []
+        if len(batch_results) != len(batch):
+            fallback = {"category": "none", "justification": "Error: result count mismatch."}
+            batch_results = (batch_results + [fallback] * len(batch))[:len(batch)]
+        results.extend(batch_results)
+    return results
+
+
+def _finish_write(report: FileReport, future: Future):
+    try:
+        report.write_s = future.result()
+    except Exception as e:
+        report.error = f"saving failed: {e}"
+    print(report.line())
+
+
+def annotate_corpus(pdf_paths: Iterable[Path], output_dir: Path, strategy: AnnotatorStrategy,
+                    batch_size: int = 16, workers: Optional[int] = None, prefetch: int = 4,
+                    suffix: str = "_annotated", with_geometry: bool = False,
+                    overwrite: bool = False, checkpoint: bool = False,
+                    section_filter: bool = False) -> List[FileReport]:
+    """
+    Annotates every PDF with one already-loaded `strategy`.
+
+    Extraction and highlighting run in a process pool. A producer thread
+    submits extractions and hands them to the inference loop (this thread)
+    through a queue of at most `prefetch` documents, so the model always
+    has the next paper ready while memory stays bounded. Finished outputs
+    (newer than their input) are skipped unless `overwrite` is set.
+    With `checkpoint`, results are also appended per batch to a sidecar
+    next to each output, so a pre-empted document resumes mid-way.
+    `section_filter` drops references, headers/footers and boilerplate at
+    extraction time (see `utils.section_filter`).
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    pending = []
+    skipped = 0
+    for pdf_path in pdf_paths:
+        output_path = output_path_for(pdf_path, output_dir, suffix)
+        if not overwrite and is_done(pdf_path, output_path):
+            skipped += 1
+            continue
+        pending.append((pdf_path, output_path))
+    print(f"[INFO] {len(pending)} PDFs to annotate, {skipped} already done.")
+    if not pending:
+        return []
+
+    workers = workers or max(1, (os.cpu_count() or 2) - 1)
+    reports: List[FileReport] = []
+    writes: List[Tuple[FileReport, Future]] = []
+    extracted: "queue.Queue" = queue.Queue(maxsize=max(1, prefetch))
+    started = time.perf_counter()
+
+    # 'spawn' keeps workers independent of the model and CUDA state of this process
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        def produce():
+            try:
+                for pdf_path, output_path in pending:
+                    try:
+                        future = pool.submit(_extract_job, pdf_path, with_geometry, section_filter)
+                    except Exception as e:
+                        # e.g. BrokenProcessPool: reported as this file's extraction error
+                        future = Future()
+                        future.set_exception(e)
+                    # Blocks once `prefetch` documents are waiting for the model
+                    extracted.put((pdf_path, output_path, future))
+            finally:
+                # Always, or the inference loop would wait forever
+                extracted.put(None)
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+
+        while True:
+            item = extracted.get()
+            if item is None:
+                break
+            pdf_path, output_path, future = item
+            report = FileReport(pdf_path, output_path)
+            reports.append(report)
+            try:
+                chunks, report.extract_s = future.result()
+            except Exception as e:
+                report.error = f"extraction failed: {e}"
+                print(report.line())
+                continue
+            report.sentences = len(chunks)
+
+            start = time.perf_counter()
+            texts = [chunk[1] for chunk in chunks]
+            # Identical sentences are classified once and share the result
+            unique, duplicates = first_occurrences(texts, list(range(len(texts))))
+            unique_texts = [texts[i] for i in unique]
+            if checkpoint:
+                pages = [chunks[i][0] for i in unique]
+                unique_results = _classify_with_checkpoint(strategy, pages, unique_texts, batch_size, output_path)
+            else:
+                unique_results = classify_document(strategy, unique_texts, batch_size)
+            results = [None] * len(texts)
+            for i, result in zip(unique, unique_results):
+                results[i] = result
+            for i, first in duplicates.items():
+                results[i] = results[first]
+            report.infer_s = time.perf_counter() - start
+
+            annotations = [
+                (page_idx, text, result, *geometry)
+                for (page_idx, text, *geometry), result in zip(chunks, results)
+            ]
+            try:
+                writes.append((report, pool.submit(_highlight_job, pdf_path, annotations, output_path)))
+            except Exception as e:
+                report.error = f"saving failed: {e}"
+                print(report.line())
+
+            # Report files as their saves complete, without waiting on them
+            for finished in [w for w in writes if w[1].done()]:
+                _finish_write(*finished)
+                writes.remove(finished)
+
+        producer.join()
+        for report, future in writes:
+            _finish_write(report, future)
+
+    elapsed = time.perf_counter() - started
+    done = [r for r in reports if not r.error]
+    sentences = sum(r.sentences for r in done)
+    infer_s = sum(r.infer_s for r in done)
+    print(
+        f"[INFO] Corpus: {len(done)}/{len(reports)} PDFs in {elapsed:.1f}s "
+        f"({len(done) / elapsed:.2f} PDFs/s, {sentences / elapsed:.1f} sentences/s overall, "
+        f"model busy {infer_s / elapsed:.0%})"
+    )
+    return reports
@@ -1,37 +1,174 @@
+import time
+
 from config.labels import CATEGORY_COLORS
 import fitz  # PyMuPDF
 from typing import List, Dict, Tuple
 from pathlib import Path
 
+from utils.instrumentation import TRACER
+from utils.pdf_extract import PAGE_BREAK
+
 # <-- NEW: Import ONNX and the HF tokenizer for chat templating
 
 # ==========================================================
 # PDF Highlighting (Unchanged)
 # ==========================================================
-def add_highlights(pdf_path: Path, annotations: List[Tuple[int, str, Dict]], output_path: Path):
-    doc = fitz.open(pdf_path)
-    for page_idx, sentence, result in annotations:
+SAVE_MODES = ("full", "fast", "incremental")
+# Subject of every highlight this tool writes, so a later run can find them
+ANNOT_SUBJECT = "Auto-Paper-Annotator"
+
+
+class HighlightWriter:
+    """
+    Adds highlight annotations to an already open document, one sentence at
+    a time, so results can be written as soon as they are classified.
+    `line_rects` (from geometry extraction) are highlighted directly;
+    without them the sentence is searched on its page.
+
+    All quads of a sentence on one page go into a single multi-quad
+    highlight, so each sentence costs one annotation (per page) and one
+    `update()`. The most recently used pages are kept loaded, so sentences
+    arriving in page order load every page once. `timings` holds the
+    seconds spent annotating and saving.
+    """
+
+    PAGE_CACHE = 2   # current page and the next one, for sentences crossing a page break
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.written = 0
+        self.missing = 0
+        self.annotations = 0
+        self.timings = {"annotate_s": 0.0, "save_s": 0.0}
+        # Keep references, annots are unbound once their page is freed
+        self._pages: Dict[int, fitz.Page] = {}
+
+    def _page(self, page_idx: int):
+        page = self._pages.get(page_idx)
+        if page is None:
+            if len(self._pages) >= self.PAGE_CACHE:
+                self._pages.pop(next(iter(self._pages)))
+            page = self._pages[page_idx] = self.doc[page_idx]
+        return page
+
+    def add(self, page_idx: int, sentence: str, result: Dict, line_rects=None) -> bool:
+        """Returns False when nothing was highlighted (category 'none' or text not found)."""
         cat = result.get("category", "none")
         if cat == "none":
-            continue
+            return False
 
         color = CATEGORY_COLORS.get(cat)
         if not color:
             print(f"[WARN] No color defined for category: '{cat}'. Using gray.")
             color = (0.8, 0.8, 0.8)
 
-        page = doc[page_idx]
-        areas = page.search_for(sentence, quads=True)
+        start = time.perf_counter()
+        quads_by_page: Dict[int, list] = {}
+        if line_rects:
+            for idx, rect in line_rects:
+                quads_by_page.setdefault(idx, []).append(fitz.Rect(rect).quad)
+        else:
+            # Sentences joined across a page break are searched part by part
+            for k, part in enumerate(sentence.split(PAGE_BREAK)):
+                if page_idx + k < len(self.doc):
+                    quads = self._page(page_idx + k).search_for(part, quads=True)
+                    if quads:
+                        quads_by_page.setdefault(page_idx + k, []).extend(quads)
 
-        if not areas:
+        if not quads_by_page:
             print(f"[WARN] Could not find sentence on page {page_idx+1}: '{sentence[:50]}...'")
-            continue
+            self.missing += 1
+            TRACER.count("highlight.not_found")
+            self.timings["annotate_s"] += time.perf_counter() - start
+            return False
 
-        for quad in areas:
-            hl = page.add_highlight_annot(quad)
+        for area_page, quads in quads_by_page.items():
+            hl = self._page(area_page).add_highlight_annot(quads)
             hl.set_colors(stroke=color)
-            hl.set_info(title=cat, content=result.get("justification", "No justification provided."))
+            # Compact LLM output carries no justification; the title alone is enough then
+            hl.set_info(title=cat, content=result.get("justification") or "", subject=ANNOT_SUBJECT)
             hl.update()
+            self.annotations += 1
+        self.written += 1
+        self.timings["annotate_s"] += time.perf_counter() - start
+        return True
+
+    def remove_previous(self) -> int:
+        """
+        Deletes the highlights an earlier run wrote into the document (our
+        subject, or a category title from before the subject was set), so
+        an incremental save replaces them instead of stacking duplicates.
+        Returns how many were removed.
+        """
+        removed = 0
+        for page in self.doc:
+            for annot in list(page.annots(types=[fitz.PDF_ANNOT_HIGHLIGHT])):
+                info = annot.info
+                if info.get("subject") == ANNOT_SUBJECT or info.get("title") in CATEGORY_COLORS:
+                    page.delete_annot(annot)
+                    removed += 1
+        self._pages.clear()
+        return removed
+
+    def save(self, output_path: Path, mode: str = "full"):
+        """
+        "full": compressed rewrite with garbage collection (smallest file).
+        "fast": rewrite without garbage collection or re-compression.
+        "incremental": appends the new annotations to the opened file
+        itself, so `output_path` must be that file (see `remove_previous`).
+        """
+        if mode not in SAVE_MODES:
+            raise ValueError(f"Unknown save mode '{mode}', expected one of {SAVE_MODES}.")
+        self._pages.clear()
+        start = time.perf_counter()
+        with TRACER.stage("highlight.save", mode=mode):
+            self._save(output_path, mode)
+        self.timings["save_s"] += time.perf_counter() - start
+
+    def _save(self, output_path: Path, mode: str):
+        if mode == "incremental":
+            if Path(self.doc.name).resolve() != Path(output_path).resolve():
+                raise ValueError("Incremental save writes into the input PDF; output_path must be the input path.")
+            if not self.doc.can_save_incrementally():
+                raise ValueError(f"{self.doc.name} cannot be saved incrementally (it needs repair); use 'full'.")
+            self.doc.saveIncr()
+        elif mode == "fast":
+            self.doc.save(output_path, garbage=0, deflate=False)
+        else:
+            self.doc.save(output_path, deflate=True, garbage=4)
+
+    def report(self) -> str:
+        return (
+            f"{self.written} sentences highlighted with {self.annotations} annotations "
+            f"({self.missing} not found), annotate {self.timings['annotate_s']:.2f}s, "
+            f"save {self.timings['save_s']:.2f}s"
+        )
+
+
+def add_highlights(pdf_path: Path, annotations: List[Tuple], output_path: Path,
+                   save_mode: str = "full") -> HighlightWriter:
+    """
+    `annotations` holds (page_idx, sentence, result) tuples, or
+    (page_idx, sentence, result, line_rects) when the sentence was extracted
+    with geometry. Stored line rects are highlighted directly; only entries
+    without them fall back to searching the page for the sentence text.
+    Annotations are written in page order; see `HighlightWriter.save` for
+    `save_mode`. An incremental save first removes the highlights of an
+    earlier run. Returns the writer for its counts and timings.
+    """
+    doc = fitz.open(pdf_path)
+    writer = HighlightWriter(doc)
+    if save_mode == "incremental":
+        _replace_previous(writer)
+    with TRACER.stage("highlight.annotate", sentences=len(annotations)):
+        for page_idx, sentence, result, *geometry in sorted(annotations, key=lambda a: a[0]):
+            writer.add(page_idx, sentence, result, geometry[0] if geometry else None)
+    writer.save(output_path, save_mode)
+    doc.close()
+    return writer
+
 
-    doc.save(output_path, deflate=True, garbage=4)
-    doc.close()
\ No newline at end of file
+def _replace_previous(writer: HighlightWriter):
+    removed = writer.remove_previous()
+    if removed:
+        print(f"[INFO] Replacing {removed} highlights from an earlier run.")
@@ -0,0 +1,207 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import resource   # Unix only
+except ImportError:
+    resource = None
+
+# ==========================================================
+# Per-stage instrumentation (off unless TRACER.enable() is called)
+# ==========================================================
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far, None where it is not available."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes on Linux
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+class _NoStage:
+    """What `stage()` returns while tracing is off: a shared, do-nothing context."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NO_STAGE = _NoStage()
+
+
+class _Stage:
+    __slots__ = ("tracer", "name", "args", "start", "cpu")
+
+    def __init__(self, tracer: "Tracer", name: str, args: Dict):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.cpu = time.process_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.start
+        self.tracer.add(self.name, wall, start=self.start, cpu_s=time.process_time() - self.cpu, **self.args)
+        return False
+
+    def set(self, **args):
+        """Attaches counts known only inside the stage (e.g. tokens generated)."""
+        self.args.update(args)
+
+
+class Tracer:
+    """
+    Collects one event per stage run: name, wall seconds, process CPU
+    seconds (all threads, so onnxruntime's intra-op threads count), peak
+    RSS at the end of the stage and any numeric arguments such as
+    `tokens` or `sentences`. `counters` holds plain event counts
+    (fallbacks, parse failures, sentences not found, ...).
+
+    While disabled, `stage()` returns a shared no-op context and `count()`
+    returns at once, so instrumented code pays one attribute check.
+    Callers that time loops themselves (token decoding, where a context
+    per token would be wasteful) report the total with `add()`.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.events: List[Dict] = []
+        self.counters: Counter = Counter()
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    def enable(self):
+        self.enabled = True
+
+    def reset(self):
+        with self._lock:
+            self.events, self.counters = [], Counter()
+            self._origin = time.perf_counter()
+
+    def stage(self, name: str, **args):
+        """`with TRACER.stage("extract", pages=n) as st: ...; st.set(sentences=k)`"""
+        if not self.enabled:
+            return _NO_STAGE
+        return _Stage(self, name, args)
+
+    def add(self, name: str, wall_s: float, start: Optional[float] = None,
+            cpu_s: Optional[float] = None, **args):
+        """Records a stage that was timed by the caller; `start` is a perf_counter() value."""
+        if not self.enabled:
+            return
+        if start is None:
+            start = time.perf_counter() - wall_s
+        event = {
+            "name": name,
+            "start_s": start - self._origin,
+            "wall_s": wall_s,
+            "cpu_s": cpu_s,
+            "peak_rss_mb": peak_rss_mb(),
+            "thread": threading.get_ident(),
+            "args": args,
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def count(self, name: str, n: int = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] += n
+
+    # ------------------------------------------------------------------ #
+    # Summaries and export
+    # ------------------------------------------------------------------ #
+    def summary(self) -> Dict:
+        """Per-stage totals (calls, wall, CPU, summed args and their per-second rates), counters, peak RSS."""
+        stages: Dict[str, Dict] = {}
+        with self._lock:
+            events = list(self.events)
+            counters = dict(self.counters)
+        for event in events:
+            st = stages.setdefault(event["name"], {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "args": defaultdict(float)})
+            st["calls"] += 1
+            st["wall_s"] += event["wall_s"]
+            st["cpu_s"] += event["cpu_s"] or 0.0
+            for key, value in event["args"].items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    st["args"][key] += value
+        for st in stages.values():
+            args = dict(st.pop("args"))
+            st.update(args)
+            if st["wall_s"] > 0:
+                st.update({f"{key}_per_s": value / st["wall_s"] for key, value in args.items()})
+        return {"stages": stages, "counters": counters, "peak_rss_mb": peak_rss_mb()}
+
+    def report(self) -> str:
+        summary = self.summary()
+        lines = []
+        for name, st in summary["stages"].items():
+            rates = ", ".join(
+                f"{st[key]:.0f} {key[:-len('_per_s')]}/s" for key in st if key.endswith("_per_s")
+            )
+            lines.append(
+                f"{name:<22} {st['calls']:>6}x  wall {st['wall_s']:8.3f}s  cpu {st['cpu_s']:8.3f}s"
+                + (f"  ({rates})" if rates else "")
+            )
+        if summary["counters"]:
+            lines.append("counters: " + ", ".join(f"{k} {v}" for k, v in sorted(summary["counters"].items())))
+        if summary["peak_rss_mb"] is not None:
+            lines.append(f"peak RSS {summary['peak_rss_mb']:.0f} MB")
+        return "\n".join(lines)
+
+    def export(self, path: Path):
+        """
+        `.json` → Chrome trace (chrome://tracing, https://ui.perfetto.dev);
+        anything else → JSON lines, one event per line and a final summary line.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            events = list(self.events)
+        summary = self.summary()
+        with open(path, "w", encoding="utf-8") as f:
+            if path.suffix == ".json":
+                pid = os.getpid()
+                trace = [
+                    {
+                        "name": e["name"], "ph": "X", "pid": pid, "tid": e["thread"],
+                        "ts": e["start_s"] * 1e6, "dur": e["wall_s"] * 1e6,
+                        "args": {**e["args"], "cpu_s": e["cpu_s"], "peak_rss_mb": e["peak_rss_mb"]},
+                    }
+                    for e in events
+                ]
+                json.dump({"traceEvents": trace, "displayTimeUnit": "ms", "otherData": summary}, f)
+            else:
+                for e in events:
+                    f.write(json.dumps(e) + "\n")
+                f.write(json.dumps({"summary": summary}) + "\n")
+
+
+# One tracer per process; enabled by the `--trace` flag of the scripts
+TRACER = Tracer()
+
+
+def finish_trace(path: Optional[Path]):
+    """Prints the stage summary and writes the trace, when tracing was requested."""
+    if path is None or not TRACER.enabled:
+        return
+    print("[INFO] Stage timings:\n" + TRACER.report())
+    TRACER.export(path)
+    print(f"[INFO] Trace written to {path}")
@@ -1,34 +1,286 @@
+import multiprocessing
+import os
 import re
 import fitz  # PyMuPDF
-import nltk
-from typing import List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from bisect import bisect_left, bisect_right
+from typing import Iterator, List, Optional, Tuple
 from pathlib import Path
 
+from utils.instrumentation import TRACER
+from utils.section_filter import SectionFilter
+
+# A line-level highlight area: (page_idx, (x0, y0, x1, y1))
+LineRect = Tuple[int, Tuple[float, float, float, float]]
+
+# nltk takes longer to import than everything else the CLIs load up front,
+# so it is imported by the functions that tokenize
+
 # <-- NEW: Import ONNX and the HF tokenizer for chat templating
 # ==========================================================
 # Text Extraction and Cleaning (Unchanged)
 # ==========================================================
+_CITATION_YEAR = re.compile(r'\s*\([^)]*,\s*\d{4}\)')
+_CITATION_NUMBER = re.compile(r'\s*\[\d+(?:,\s*\d+)*\]')
+_SKIP_PREFIXES = ('figure', 'table', 'fig.')
+# A page's last sentence is unfinished when it lacks closing punctuation
+_SENTENCE_END = re.compile(r'[.!?]["\'\u201d\u2019)\]]*\s*$')
+# Joins the parts of a sentence continued on the next page (see HighlightWriter)
+PAGE_BREAK = "\f"
+# Punctuation around a word, ignored when looking words up
+_WORD_EDGES = re.compile(r'^\W+|\W+$')
+
 def clean_text(text: str) -> str:
-    text = re.sub(r'\s*\([^)]*,\s*\d{4}\)', '', text)
-    text = re.sub(r'\s*\[\d+(?:,\s*\d+)*\]', '', text)
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
+    # Both citation patterns need a bracket, which most sentences do not have
+    if '(' in text:
+        text = _CITATION_YEAR.sub('', text)
+    if '[' in text:
+        text = _CITATION_NUMBER.sub('', text)
+    # Same as re.sub(r'\s+', ' ', text).strip(): \s and str.isspace agree
+    return ' '.join(text.split())
 
 def is_valid_sentence(s: str) -> bool:
     if len(s) < 30: return False
-    if sum(c.isalpha() for c in s) / len(s) < 0.7: return False
-    if s.lower().strip().startswith(('figure', 'table', 'fig.')): return False
+    if sum(map(str.isalpha, s)) / len(s) < 0.7: return False
+    if s.lower().strip().startswith(_SKIP_PREFIXES): return False
     return True
 
-def extract_and_clean_text_by_sentence(pdf_path: Path) -> List[Tuple[int, str]]:
-    doc = fitz.open(pdf_path)
-    chunks = []
+def extract_and_clean_text_by_sentence(pdf_path: Path, with_geometry: bool = False,
+                                       section_filter: bool = False, workers: int = 1,
+                                       join_pages: bool = False):
+    """
+    Returns (page_idx, sentence) tuples.
+    With `with_geometry=True`, returns (page_idx, sentence, line_rects) instead,
+    where `line_rects` are the on-page areas of the sentence (see
+    `extract_sentences_with_geometry`) so highlighting needs no text search.
+    With `section_filter=True`, references, appendices, running headers and
+    footers and boilerplate are dropped first (see `utils.section_filter`).
+    `workers` > 1 (or None for one per CPU) tokenizes page ranges in a
+    process pool via `extract_sentences_parallel`, with identical output;
+    the geometry and section-filter paths always run serially.
+    `join_pages=True` merges sentences cut by a page break into one (their
+    parts joined by PAGE_BREAK), as the geometry path always does; it is
+    ignored with `section_filter`.
+    """
+    with TRACER.stage("extract") as st:
+        if with_geometry:
+            chunks = extract_sentences_with_geometry(pdf_path, section_filter=section_filter)
+        elif (workers != 1 or join_pages) and not section_filter:
+            chunks = [(page_idx, raw) for page_idx, raw, _ in
+                      extract_sentences_parallel(pdf_path, workers, join_pages=join_pages)]
+        else:
+            doc = fitz.open(pdf_path)
+            flt = _section_filter(doc) if section_filter else None
+            chunks = list(iter_page_sentences(doc, flt))
+            doc.close()
+            if flt is not None:
+                print(f"[INFO] {flt.report()}")
+        st.set(sentences=len(chunks))
+    return chunks
+
+
+def _section_filter(doc) -> SectionFilter:
+    # Only the sample pages are read here, the rest as extraction reaches them
+    with TRACER.stage("extract.section_filter") as st:
+        flt = SectionFilter(doc)
+        st.set(pages=flt.sampled_pages)
+    return flt
+
+
+def iter_page_sentences(doc, section_filter: Optional[SectionFilter] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Generator form of the default extraction over an open document:
+    yields (page_idx, sentence) page by page, so callers can start working
+    on the first page before the last one is read.
+    """
+    import nltk
     for i, page in enumerate(doc):
-        text = page.get_text("text")
+        if section_filter is None:
+            text = page.get_text("text")
+        else:
+            text = section_filter.page_text(i)
+            _count_pruned(section_filter, i)
         sentences = nltk.sent_tokenize(text)
         for s in sentences:
             cleaned_s = clean_text(s)
             if is_valid_sentence(cleaned_s):
-                chunks.append((i, s))
+                yield i, s
+
+def _count_pruned(section_filter: SectionFilter, page_idx: int):
+    """Counts the valid sentences the filter removed from one page, per reason."""
+    import nltk
+    for reason, text in section_filter.pruned_text(page_idx).items():
+        section_filter.pruned_sentences[reason] += sum(
+            is_valid_sentence(clean_text(s)) for s in nltk.sent_tokenize(text)
+        )
+
+# ==========================================================
+# Parallel extraction
+# ==========================================================
+def _tokenize_page_range(pdf_path: Path, start: int, stop: int) -> List[List[Tuple[int, str, str, bool]]]:
+    """Worker: opens the document itself and returns (page, raw, cleaned, valid) per sentence, per page."""
+    import nltk
+    doc = fitz.open(pdf_path)
+    pages = []
+    for i in range(start, stop):
+        sentences = []
+        for s in nltk.sent_tokenize(doc[i].get_text("text")):
+            cleaned_s = clean_text(s)
+            sentences.append((i, s, cleaned_s, is_valid_sentence(cleaned_s)))
+        pages.append(sentences)
     doc.close()
-    return chunks
\ No newline at end of file
+    return pages
+
+def _join_page_breaks(pages: List[List[Tuple[int, str, str, bool]]]):
+    """
+    Merges a page's unfinished last sentence with the first sentence of the
+    next page. The parts are joined with PAGE_BREAK and the merged sentence
+    keeps the page of its first part.
+    """
+    for p in range(len(pages) - 1):
+        if not pages[p] or not pages[p + 1]:
+            continue
+        page_idx, head, _, _ = pages[p][-1]
+        if _SENTENCE_END.search(head):
+            continue
+        _, tail, _, _ = pages[p + 1][0]
+        raw = head.rstrip() + PAGE_BREAK + tail.lstrip()
+        cleaned_s = clean_text(raw)
+        pages[p].pop()
+        pages[p + 1][0] = (page_idx, raw, cleaned_s, is_valid_sentence(cleaned_s))
+
+def extract_sentences_parallel(pdf_path: Path, workers: Optional[int] = None, join_pages: bool = False,
+                               min_pages_per_task: int = 8) -> List[Tuple[int, str, str]]:
+    """
+    Sentence extraction with page ranges spread over a process pool; every
+    worker opens the document itself. Returns (page_idx, raw, cleaned)
+    triples; (page_idx, raw) is exactly what the serial
+    `extract_and_clean_text_by_sentence` returns.
+
+    With `join_pages=True`, sentences cut by a page break are merged (see
+    `_join_page_breaks`), which changes the output for such sentences.
+    Short documents are processed in this process.
+    """
+    doc = fitz.open(pdf_path)
+    page_count = len(doc)
+    doc.close()
+
+    workers = workers or os.cpu_count() or 1
+    # A few tasks per worker balances uneven pages without tiny tasks
+    step = max(min_pages_per_task, -(-page_count // (workers * 4)))
+    ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+
+    if workers == 1 or len(ranges) <= 1:
+        pages = [page for start, stop in ranges for page in _tokenize_page_range(pdf_path, start, stop)]
+    else:
+        # 'spawn' so workers never inherit model or CUDA state from the caller
+        with ProcessPoolExecutor(max_workers=min(workers, len(ranges)),
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            parts = pool.map(_tokenize_page_range, [pdf_path] * len(ranges), *zip(*ranges))
+            pages = [page for part in parts for page in part]
+
+    if join_pages:
+        _join_page_breaks(pages)
+    return [
+        (page_idx, raw, cleaned_s)
+        for page in pages
+        for page_idx, raw, cleaned_s, valid in page
+        if valid
+    ]
+
+# ==========================================================
+# Geometry-preserving extraction
+# ==========================================================
+def _build_word_stream(doc, section_filter: Optional[SectionFilter] = None) -> Tuple[str, list, list]:
+    """
+    Joins every word of the document into one string, leaving out words on
+    lines pruned by `section_filter` (whose pruned sentences are counted
+    page by page).
+    A word split by a line-end hyphen (across lines or pages) comes back
+    whole when the joined form appears elsewhere in the document; otherwise
+    (or when the second half starts with a capital or a digit, as in
+    "zero-shot" or "BERT-Base") the hyphen is kept and the halves glued.
+
+    Returns (text, word_starts, words) where `words[k]` is
+    (page_idx, rect, line_key) and `word_starts[k]` its offset in `text`.
+    """
+    raw = []
+    for page_idx, page in enumerate(doc):
+        for x0, y0, x1, y1, word, block_no, line_no, _word_no in page.get_text("words", sort=False):
+            if section_filter is not None and not section_filter.keeps(page_idx, (x0, y0, x1, y1)):
+                continue
+            raw.append((page_idx, (x0, y0, x1, y1), (page_idx, block_no, line_no), word))
+        if section_filter is not None:
+            # While the filter still holds this page's lines
+            _count_pruned(section_filter, page_idx)
+
+    vocabulary = {_WORD_EDGES.sub("", item[3]).lower() for item in raw}
+    parts, starts, words = [], [], []
+    offset = 0
+    for k, (page_idx, rect, line_key, word) in enumerate(raw):
+        if k > 0:
+            prev_word, prev_line = raw[k - 1][3], raw[k - 1][2]
+            hyphenated = prev_line != line_key and prev_word.endswith("-") and len(prev_word) > 1
+            if not hyphenated:
+                parts.append(" ")
+                offset += 1
+            elif word[:1].islower() and _WORD_EDGES.sub("", prev_word[:-1] + word).lower() in vocabulary:
+                # Drop the hyphen already emitted for the previous word
+                parts[-1] = parts[-1][:-1]
+                offset -= 1
+        starts.append(offset)
+        words.append((page_idx, rect, line_key))
+        parts.append(word)
+        offset += len(word)
+    return "".join(parts), starts, words
+
+
+def _line_rects(words: list, first: int, last: int) -> List[LineRect]:
+    """Union of the word boxes of words[first:last+1], one rectangle per text line."""
+    merged = {}
+    for page_idx, (x0, y0, x1, y1), line_key in words[first:last + 1]:
+        if line_key in merged:
+            _, (a0, b0, a1, b1) = merged[line_key]
+            merged[line_key] = (page_idx, (min(a0, x0), min(b0, y0), max(a1, x1), max(b1, y1)))
+        else:
+            merged[line_key] = (page_idx, (x0, y0, x1, y1))
+    return list(merged.values())
+
+
+def extract_sentences_with_geometry(pdf_path: Path,
+                                    section_filter: bool = False) -> List[Tuple[int, str, List[LineRect]]]:
+    """
+    Sentence extraction over the word stream of the whole document, keeping
+    for every sentence the rectangles of the lines it covers. Sentences that
+    continue across a line break, a hyphenation or a page break stay whole;
+    the page index is that of the sentence's first word.
+    """
+    import nltk
+    doc = fitz.open(pdf_path)
+    flt = _section_filter(doc) if section_filter else None
+    text, starts, words = _build_word_stream(doc, flt)
+    if flt is not None:
+        print(f"[INFO] {flt.report()}")
+    doc.close()
+
+    chunks = []
+    cursor = 0
+    for s in nltk.sent_tokenize(text):
+        begin = text.find(s, cursor)
+        if begin < 0:
+            continue
+        end = begin + len(s)
+        cursor = end
+
+        cleaned_s = clean_text(s)
+        if not is_valid_sentence(cleaned_s):
+            continue
+
+        # Words overlapping [begin, end)
+        first = max(bisect_right(starts, begin) - 1, 0)
+        last = bisect_left(starts, end) - 1
+        if last < first:
+            continue
+        rects = _line_rects(words, first, last)
+        chunks.append((rects[0][0], s, rects))
+    return chunks
@@ -0,0 +1,270 @@
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+# ==========================================================
+# Layout-aware pre-filter: references, headers/footers, boilerplate
+# ==========================================================
+_NUMBERING = re.compile(r"^(?:\d+(?:\.\d+)*|[ivxlc]+|[a-z])[.)]?\s+", re.IGNORECASE)
+_DIGITS = re.compile(r"\d+")
+# "Appendix A", "Appendix B: Proofs", "Appendices" (after _heading_key)
+_APPENDIX = re.compile(r"^(?:appendix|appendices)\b")
+
+# Section headings after which nothing is worth classifying
+STOP_HEADINGS = {
+    "references", "reference", "bibliography", "literature cited", "works cited",
+    "references and notes", "appendix", "appendices", "supplementary material",
+}
+
+BOILERPLATE_PATTERNS = [
+    re.compile(r"©|\bcopyright\b|all rights reserved", re.IGNORECASE),
+    re.compile(r"permission to make digital or hard copies", re.IGNORECASE),
+    re.compile(r"\blicen[cs]ed under\b|creative commons", re.IGNORECASE),
+    re.compile(r"^arxiv:\d{4}\.\d{4,5}", re.IGNORECASE),
+    re.compile(r"^(?:doi:|https?://(?:dx\.)?doi\.org/)", re.IGNORECASE),
+    re.compile(r"^(?:published as a conference paper at|proceedings of the)\b", re.IGNORECASE),
+    re.compile(r"^(?:correspondence to|corresponding author)\b", re.IGNORECASE),
+    re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+"),   # e-mail addresses (author blocks)
+]
+
+# Share of the page height treated as header / footer band
+MARGIN_BAND = 0.1
+
+# Stop headings must look like headings: bold or larger than body text (by
+# more than SIZE_TOLERANCE points), alone in their block, and starting at the
+# left edge of a text column (within COLUMN_TOLERANCE points)
+BOLD_FLAG = 16   # PyMuPDF span flag
+SIZE_TOLERANCE = 0.5
+COLUMN_TOLERANCE = 3.0
+MAX_HEADING_CHARS = 60
+
+
+def _line_text(line: Dict) -> str:
+    return "".join(span["text"] for span in line["spans"]).strip()
+
+
+def _heading_key(text: str) -> str:
+    """'5. References' / 'VII REFERENCES:' → 'references'."""
+    return _NUMBERING.sub("", text).strip().rstrip(":.").lower()
+
+
+def _is_stop_heading(key: str) -> bool:
+    return key in STOP_HEADINGS or (len(key) <= MAX_HEADING_CHARS and bool(_APPENDIX.match(key)))
+
+
+def _text_lines(page: Dict) -> List[Tuple[Dict, Dict]]:
+    """(line, block) pairs of the text blocks of a `get_text("dict")` page."""
+    return [
+        (line, block)
+        for block in page["blocks"] if block.get("type", 0) == 0
+        for line in block["lines"]
+    ]
+
+
+def _body_font_size(pages: List[Dict]) -> float:
+    """Median font size over all characters, i.e. the size of the body text."""
+    sizes = Counter()
+    for page in pages:
+        for line, _ in _text_lines(page):
+            for span in line["spans"]:
+                sizes[round(span["size"], 1)] += len(span["text"].strip())
+    total, seen = sum(sizes.values()), 0
+    for size in sorted(sizes):
+        seen += sizes[size]
+        if 2 * seen >= total:
+            return size
+    return 0.0
+
+
+def _column_edges(rects: List[fitz.Rect], width: float) -> List[float]:
+    """Left edges of the text columns: the left margin and, on two-column pages, the second column's."""
+    if not rects:
+        return []
+    edges = [min(rect.x0 for rect in rects)]
+    right = Counter(round(rect.x0) for rect in rects if rect.x0 >= width * 0.4)
+    if right:
+        x0, count = right.most_common(1)[0]
+        # A column edge, not a table column: a third of the page's lines start there
+        if 3 * count >= len(rects):
+            edges.append(x0)
+    return edges
+
+
+def _looks_like_heading(line: Dict, block: Dict, body_size: float, edges: List[float]) -> bool:
+    """Bold or larger than body text, alone in its block and at the left edge of a column."""
+    spans = [span for span in line["spans"] if span["text"].strip()]
+    if not spans:
+        return False
+    emphasised = (
+        min(span["size"] for span in spans) > body_size + SIZE_TOLERANCE
+        or all(span["flags"] & BOLD_FLAG or "bold" in span["font"].lower() for span in spans)
+    )
+    alone = sum(1 for other in block["lines"] if _line_text(other)) == 1
+    x0 = line["bbox"][0]
+    return emphasised and alone and any(abs(x0 - edge) <= COLUMN_TOLERANCE for edge in edges)
+
+
+def _repeat_key(text: str) -> str:
+    # Page numbers and dates change from page to page, the rest of a running header does not
+    return _DIGITS.sub("#", " ".join(text.lower().split()))
+
+
+class SectionFilter:
+    """
+    Decides, line by line and one page at a time, what in an open document
+    is not body text:
+
+    - "references": everything from the first References / Bibliography /
+      Appendix heading on (headings may be numbered, "Appendix A: ..."
+      counts). Only lines set like a heading stop the text: bold or larger
+      than the body font, alone in their block, at the left edge of a
+      column; a table cell or a sentence ending in "references." does not,
+    - "header_footer": lines in the top or bottom margin whose text (digits
+      ignored) repeats on at least `min_repeat_pages` and `repeat_ratio`
+      of up to `sample_pages` pages spread over the document,
+    - "front_matter": title, author and affiliation lines above the
+      Abstract heading on the first page,
+    - "boilerplate": copyright, licence, DOI / arXiv stamps, e-mail lines.
+
+    Only the sample pages are read up front (for the repeated margin lines
+    and the body font size); every other page is read when it is first
+    asked for, and only the last CACHED_PAGES pages are kept, so memory
+    does not grow with the document. Pages should be asked for in order:
+    a page after a skipped one makes the skipped pages be read for their
+    headings first.
+
+    `page_text` gives the text of the kept lines; `keeps(page_idx, rect)`
+    tells whether a word box lies on a kept line, for geometry extraction.
+    Pruned line counts are in `stats`, pruned sentence counts (filled in by
+    the extractor) in `pruned_sentences`.
+    """
+
+    CACHED_PAGES = 4
+
+    def __init__(self, doc, min_repeat_pages: int = 3, repeat_ratio: float = 0.3, sample_pages: int = 48):
+        self.doc = doc
+        self.stats: Counter = Counter()             # pruned lines per reason
+        self.pruned_sentences: Counter = Counter()  # filled in by the extractor
+        count = min(len(doc), sample_pages)
+        spread = sorted({round(k * (len(doc) - 1) / max(count - 1, 1)) for k in range(count)})
+        sample = [doc[i].get_text("dict") for i in spread]
+        self.sampled_pages = len(sample)
+        self.body_size = _body_font_size(sample)
+        self._repeats = self._repeated_lines(sample, max(min_repeat_pages, int(repeat_ratio * len(sample))))
+        self._stop_page: Optional[int] = None   # page of the stop heading, once seen
+        self._decided_pages = 0                 # pages 0 .. n-1 have been decided (and counted) once
+        self._cache: Dict[int, Tuple[List[Tuple[str, fitz.Rect, Optional[str]]], List[fitz.Rect]]] = {}
+
+    @staticmethod
+    def _in_margin(rect: fitz.Rect, height: float) -> bool:
+        return rect.y1 <= height * MARGIN_BAND or rect.y0 >= height * (1 - MARGIN_BAND)
+
+    def _repeated_lines(self, pages: List[Dict], min_pages: int) -> set:
+        """Frequency index over margin lines → the texts found on at least `min_pages` pages."""
+        seen = defaultdict(set)
+        for page_idx, page in enumerate(pages):
+            for line, _ in _text_lines(page):
+                text = _line_text(line)
+                if text and self._in_margin(fitz.Rect(line["bbox"]), page["height"]):
+                    seen[_repeat_key(text)].add(page_idx)
+        return {key for key, found in seen.items() if len(found) >= min_pages}
+
+    def _page(self, page_idx: int) -> Tuple[List[Tuple[str, fitz.Rect, Optional[str]]], List[fitz.Rect]]:
+        """(text, rect, reason) per line of one page, and the rectangles of the pruned lines."""
+        cached = self._cache.get(page_idx)
+        if cached is None:
+            # Earlier pages may hold the stop heading
+            for skipped in range(self._decided_pages, page_idx):
+                self._decide(skipped)
+            cached = self._decide(page_idx)
+        return cached
+
+    def _decide(self, page_idx: int):
+        page = self.doc[page_idx].get_text("dict")
+        lines = [(line, block, _line_text(line), fitz.Rect(line["bbox"])) for line, block in _text_lines(page)]
+        before_abstract = page_idx == 0 and any(_heading_key(t) == "abstract" for _, _, t, _ in lines)
+        height = page["height"]
+        edges = _column_edges([rect for _, _, _, rect in lines], page["width"])
+        stopped = self._stop_page is not None and self._stop_page < page_idx
+        first_visit = page_idx >= self._decided_pages
+        decided = []
+        for line, block, text, rect in lines:
+            key = _heading_key(text)
+            if not stopped and _is_stop_heading(key) and _looks_like_heading(line, block, self.body_size, edges):
+                stopped = True
+                if self._stop_page is None:
+                    self._stop_page = page_idx
+            if key == "abstract":
+                before_abstract = False
+
+            if stopped:
+                reason = "references"
+            elif self._in_margin(rect, height) and _repeat_key(text) in self._repeats:
+                reason = "header_footer"
+            elif before_abstract:
+                reason = "front_matter"
+            elif any(p.search(text) for p in BOILERPLATE_PATTERNS):
+                reason = "boilerplate"
+            else:
+                reason = None
+            if reason and text and first_visit:
+                self.stats[reason] += 1
+            decided.append((text, rect, reason))
+
+        self._decided_pages = max(self._decided_pages, page_idx + 1)
+        if len(self._cache) >= self.CACHED_PAGES:
+            del self._cache[next(iter(self._cache))]
+        self._cache[page_idx] = (decided, [rect for _, rect, reason in decided if reason])
+        return self._cache[page_idx]
+
+    def page_text(self, page_idx: int) -> str:
+        lines, _ = self._page(page_idx)
+        return "\n".join(text for text, _, reason in lines if reason is None)
+
+    def pruned_text(self, page_idx: int) -> Dict[str, str]:
+        """Pruned text of one page grouped by reason (used to count pruned sentences)."""
+        lines, _ = self._page(page_idx)
+        grouped = defaultdict(list)
+        for text, _, reason in lines:
+            if reason:
+                grouped[reason].append(text)
+        return {reason: "\n".join(texts) for reason, texts in grouped.items()}
+
+    def keeps(self, page_idx: int, rect: Tuple[float, float, float, float]) -> bool:
+        """False when the centre of a word box falls on a pruned line."""
+        _, dropped = self._page(page_idx)
+        if not dropped:
+            return True
+        x0, y0, x1, y1 = rect
+        centre = fitz.Point((x0 + x1) / 2, (y0 + y1) / 2)
+        return not any(line_rect.contains(centre) for line_rect in dropped)
+
+    def report(self) -> str:
+        if not self.stats:
+            return "section filter: nothing pruned"
+        lines = ", ".join(f"{reason} {count}" for reason, count in self.stats.most_common())
+        sentences = ", ".join(f"{reason} {count}" for reason, count in self.pruned_sentences.most_common())
+        return (
+            f"section filter pruned {sum(self.pruned_sentences.values())} sentences ({sentences or 'none'}) "
+            f"from {sum(self.stats.values())} lines ({lines})"
+        )
+
+
+def first_occurrences(texts: List[str], indices: List[int]) -> Tuple[List[int], Dict[int, int]]:
+    """
+    Splits `indices` into the first occurrence of each distinct sentence and
+    a map duplicate index → index of its first occurrence, so identical
+    sentences are classified once.
+    """
+    first: Dict[str, int] = {}
+    unique, duplicates = [], {}
+    for i in indices:
+        key = " ".join(texts[i].split())
+        if key in first:
+            duplicates[i] = first[key]
+        else:
+            first[key] = i
+            unique.append(i)
+    return unique, duplicates
@@ -0,0 +1,419 @@
+import json
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Tuple
+
+from annotators.base import AnnotatorStrategy
+from annotators.cache import CachedAnnotator
+from utils.corpus import classify_document
+from utils.highlighting import SAVE_MODES, add_highlights
+from utils.pdf_extract import extract_and_clean_text_by_sentence
+from utils.section_filter import first_occurrences
+
+# ==========================================================
+# Resident annotation server: shared batches across jobs
+# ==========================================================
+class ServerBusy(Exception):
+    """Raised when accepting a job would exceed the server's queue limits."""
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class BatchCoalescer:
+    """
+    Owns one loaded strategy and the only thread that calls its
+    `classify_batch`. Sentences submitted by concurrent jobs wait in one
+    queue; a batch is cut as soon as `batch_size` sentences are waiting, or
+    `max_wait` seconds after the oldest one arrived, so a lone small job is
+    not held back for long and busy periods fill every batch.
+
+    LLM strategies (those with `plan_batches`) get each cut packed into
+    prompts of at most `token_budget` tokens, decoded `parallel_sequences`
+    at a time with `classify_stream`, as `main_llm.py` does; other
+    strategies get it as one `classify_batch` call. If a batch raises
+    anyway, its futures get the exception and the thread serves the next.
+
+    `submit` refuses a job (ServerBusy) when it would take the queue past
+    `max_pending` sentences. A job that does not fit is still accepted
+    while the queue is at or below the low-water mark (a quarter of
+    `max_pending`), so a document larger than `max_pending` gets in too.
+    A refused job also reserves its room for RESERVATION_S seconds: other
+    jobs are then admitted only while that room stays free, so the queue
+    drains until the refused job fits on its retry instead of being
+    refilled by a steady stream of small jobs.
+    """
+
+    LATENCY_WINDOW = 1000   # most recent sentences (or jobs) kept for the latency percentiles
+    RESERVATION_S = 15.0    # longer than the client's longest back-off between retries
+
+    def __init__(self, strategy: AnnotatorStrategy, batch_size: int = 16,
+                 max_wait: float = 0.02, max_pending: int = 4096,
+                 token_budget: Optional[int] = None, parallel_sequences: int = 1):
+        self.strategy = strategy
+        self.token_budget = token_budget
+        self.parallel_sequences = max(1, parallel_sequences)
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait
+        self.max_pending = max(self.batch_size, max_pending)
+        self.low_water = self.max_pending // 4
+        self._reserved = 0            # size of the largest recently refused job
+        self._reserved_until = 0.0
+        self._pending: Deque[Tuple[str, Future, float]] = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.stats = {
+            "sentences": 0, "batches": 0, "failed_batches": 0, "deduplicated": 0, "rejected_jobs": 0,
+            "max_queue_depth": 0, "infer_s": 0.0,
+        }
+        self._waits: Deque[float] = deque(maxlen=self.LATENCY_WINDOW)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, texts: List[str]) -> List[Future]:
+        """Queues `texts`; each future resolves to that sentence's result dict."""
+        futures = [Future() for _ in texts]
+        now = time.perf_counter()
+        with self._cond:
+            if self._closed:
+                raise ServerBusy("server is shutting down")
+            if not self._admits(len(texts), now):
+                self.stats["rejected_jobs"] += 1
+                if now >= self._reserved_until:
+                    self._reserved = 0
+                self._reserved = max(self._reserved, len(texts))
+                self._reserved_until = now + self.RESERVATION_S
+                raise ServerBusy(f"{len(self._pending)} sentences already queued (limit {self.max_pending})")
+            if len(texts) >= self._reserved:
+                # The refused job is back (or a larger one took its room)
+                self._reserved, self._reserved_until = 0, 0.0
+            self._pending.extend((text, future, now) for text, future in zip(texts, futures))
+            self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], len(self._pending))
+            self._cond.notify()
+        return futures
+
+    def _admits(self, size: int, now: float) -> bool:
+        depth = len(self._pending)
+        room = self.max_pending
+        if now < self._reserved_until and size < self._reserved:
+            # Keep the room a refused job needs, at most down to the low-water mark
+            room -= min(self._reserved, self.max_pending - self.low_water)
+        return depth + size <= room or (depth <= self.low_water and room == self.max_pending)
+
+    def classify(self, texts: List[str]) -> List[Dict]:
+        """Blocking form of `submit`."""
+        return [future.result() for future in self.submit(texts)]
+
+    def _next_batch(self) -> List[Tuple[str, Future, float]]:
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if not self._pending:
+                return []
+            # Give other jobs until the oldest sentence's deadline to fill the batch
+            deadline = self._pending[0][2] + self.max_wait
+            while len(self._pending) < self.batch_size and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            started = time.perf_counter()
+            # Jobs often share sentences (boilerplate, resubmitted papers): classify each text once
+            texts = list(dict.fromkeys(text for text, _, _ in batch))
+            try:
+                by_text = dict(zip(texts, self._classify(texts)))
+            except Exception as e:
+                # This is the only inference thread: fail the batch's jobs, keep serving the rest
+                print(f"[ERROR] Batch failed: {e}")
+                error = RuntimeError(f"Classification failed: {e}")
+                for _, future, _ in batch:
+                    future.set_exception(error)
+                with self._cond:
+                    self.stats["failed_batches"] += 1
+                continue
+            finished = time.perf_counter()
+            for text, future, queued in batch:
+                future.set_result(by_text[text])
+                self._waits.append(finished - queued)
+            with self._cond:
+                self.stats["sentences"] += len(batch)
+                self.stats["deduplicated"] += len(batch) - len(texts)
+                self.stats["batches"] += 1
+                self.stats["infer_s"] += finished - started
+
+    def _classify(self, texts: List[str]) -> List[Dict]:
+        cached = self.strategy if isinstance(self.strategy, CachedAnnotator) else None
+        results = cached.lookup(texts) if cached is not None else [None] * len(texts)
+        todo = [i for i, result in enumerate(results) if result is None]
+        if not todo:
+            return results
+        model = cached.strategy if cached is not None else self.strategy
+        todo_texts = [texts[i] for i in todo]
+        if hasattr(model, "plan_batches"):
+            fresh = self._classify_packed(model, todo_texts)
+        else:
+            fresh = classify_document(model, todo_texts, len(todo_texts))
+        if cached is not None:
+            cached.misses += len(todo)
+            cached.store(todo_texts, fresh)
+        for i, result in zip(todo, fresh):
+            results[i] = result
+        return results
+
+    def _classify_packed(self, model: AnnotatorStrategy, texts: List[str]) -> List[Dict]:
+        """Token-budget batches through `classify_stream`, padded like `classify_document`."""
+        budget = {} if self.token_budget is None else {"token_budget": self.token_budget}
+        ranges = model.plan_batches(texts, **budget)
+        results: List[Optional[Dict]] = [None] * len(texts)
+        try:
+            batches = (texts[start:end] for start, end in ranges)
+            for b, batch_results in model.classify_stream(batches, num_sequences=self.parallel_sequences):
+                start, end = ranges[b]
+                results[start:end] = (list(batch_results) + [None] * (end - start))[:end - start]
+        except Exception as e:
+            print(f"[ERROR] Batch failed: {e}. Using 'none' fallback.")
+        fallback = {"category": "none", "justification": "Error: missing result."}
+        return [result if result is not None else fallback for result in results]
+
+    def report(self) -> Dict:
+        with self._cond:
+            stats = dict(self.stats)
+            stats["queue_depth"] = len(self._pending)
+        waits = list(self._waits)
+        stats["mean_batch_fill"] = stats["sentences"] / stats["batches"] if stats["batches"] else 0.0
+        stats["sentence_latency_p50_s"] = _percentile(waits, 0.5)
+        stats["sentence_latency_p95_s"] = _percentile(waits, 0.95)
+        stats["model_id"] = self.strategy.model_id
+        return stats
+
+    def close(self):
+        """Stops the inference thread once the queued sentences are done."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+
+class AnnotationService:
+    """
+    The jobs the server accepts, independent of the transport: a sentence
+    list, or a PDF that is extracted in the calling (request) thread and
+    highlighted into `output` when one is given. Every named strategy has
+    its own BatchCoalescer; the first one is the default.
+
+    At most `max_jobs` jobs run at once; further ones get ServerBusy.
+    """
+
+    def __init__(self, coalescers: Dict[str, BatchCoalescer], max_jobs: int = 32):
+        if not coalescers:
+            raise ValueError("AnnotationService needs at least one strategy.")
+        self.coalescers = coalescers
+        self.default = next(iter(coalescers))
+        self._slots = threading.BoundedSemaphore(max(1, max_jobs))
+        self._lock = threading.Lock()
+        self.max_jobs = max(1, max_jobs)
+        self.jobs = {"running": 0, "done": 0, "failed": 0, "rejected": 0}
+        self._latencies: Deque[float] = deque(maxlen=BatchCoalescer.LATENCY_WINDOW)
+        self.started = time.time()
+
+    def _coalescer(self, name: Optional[str]) -> BatchCoalescer:
+        name = name or self.default
+        if name not in self.coalescers:
+            raise ValueError(f"Unknown strategy '{name}', expected one of {sorted(self.coalescers)}.")
+        return self.coalescers[name]
+
+    def _classify(self, coalescer: BatchCoalescer, texts: List[str]) -> List[Dict]:
+        unique, duplicates = first_occurrences(texts, list(range(len(texts))))
+        results = [None] * len(texts)
+        for i, result in zip(unique, coalescer.classify([texts[i] for i in unique])):
+            results[i] = result
+        for i, first in duplicates.items():
+            results[i] = results[first]
+        return results
+
+    def _run_job(self, job, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.jobs["rejected"] += 1
+            raise ServerBusy(f"{self.max_jobs} jobs already running")
+        start = time.perf_counter()
+        with self._lock:
+            self.jobs["running"] += 1
+        outcome = "failed"
+        try:
+            result = job(*args, **kwargs)
+            outcome = "done"
+            return result
+        except ServerBusy:
+            outcome = "rejected"
+            raise
+        finally:
+            with self._lock:
+                self.jobs["running"] -= 1
+                self.jobs[outcome] += 1
+                self._latencies.append(time.perf_counter() - start)
+            self._slots.release()
+
+    def annotate_sentences(self, sentences: List[str], strategy: Optional[str] = None) -> List[Dict]:
+        if not isinstance(sentences, list) or not all(isinstance(s, str) for s in sentences):
+            raise ValueError("'sentences' must be a list of strings.")
+        coalescer = self._coalescer(strategy)
+        return self._run_job(self._classify, coalescer, sentences)
+
+    def annotate_pdf(self, pdf: str, output: Optional[str] = None, strategy: Optional[str] = None,
+                     geometry: bool = False, section_filter: bool = False,
+                     save_mode: str = "full") -> Dict:
+        coalescer = self._coalescer(strategy)
+        pdf_path = Path(pdf).expanduser().resolve()
+        if not pdf_path.is_file():
+            raise FileNotFoundError(f"PDF not found: {pdf_path}")
+        if save_mode not in SAVE_MODES:
+            raise ValueError(f"Unknown save mode '{save_mode}', expected one of {SAVE_MODES}.")
+        if save_mode == "incremental" and output and Path(output).expanduser().resolve() != pdf_path:
+            raise ValueError("save_mode 'incremental' writes into the input PDF; 'output' must be the input path.")
+        return self._run_job(self._annotate_pdf, coalescer, pdf_path, output, geometry, section_filter, save_mode)
+
+    def _annotate_pdf(self, coalescer: BatchCoalescer, pdf_path: Path, output: Optional[str],
+                      geometry: bool, section_filter: bool, save_mode: str) -> Dict:
+        timings = {}
+        start = time.perf_counter()
+        chunks = extract_and_clean_text_by_sentence(pdf_path, with_geometry=geometry, section_filter=section_filter)
+        timings["extract_s"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = self._classify(coalescer, [chunk[1] for chunk in chunks])
+        timings["classify_s"] = time.perf_counter() - start
+
+        response = {
+            "pdf": str(pdf_path),
+            "annotations": [[chunk[0], chunk[1], result] for chunk, result in zip(chunks, results)],
+            "timings": timings,
+        }
+        if output:
+            output_path = Path(output).expanduser().resolve()
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            annotations = [
+                (page_idx, text, result, *rest)
+                for (page_idx, text, *rest), result in zip(chunks, results)
+            ]
+            if save_mode == "incremental":
+                writer = add_highlights(pdf_path, annotations, output_path, save_mode=save_mode)
+            else:
+                # Written next to the target and renamed, so readers never see a half-saved file
+                with tempfile.NamedTemporaryFile(dir=output_path.parent, suffix=".part", delete=False) as tmp:
+                    partial = Path(tmp.name)
+                try:
+                    writer = add_highlights(pdf_path, annotations, partial, save_mode=save_mode)
+                    partial.replace(output_path)
+                finally:
+                    partial.unlink(missing_ok=True)
+            timings.update(writer.timings)
+            response["output"] = str(output_path)
+            response["highlighted"] = writer.written
+        return response
+
+    def report(self) -> Dict:
+        with self._lock:
+            jobs = dict(self.jobs)
+            latencies = list(self._latencies)
+        jobs["latency_p50_s"] = _percentile(latencies, 0.5)
+        jobs["latency_p95_s"] = _percentile(latencies, 0.95)
+        return {
+            "uptime_s": time.time() - self.started,
+            "jobs": jobs,
+            "strategies": {name: c.report() for name, c in self.coalescers.items()},
+        }
+
+    def close(self):
+        for coalescer in self.coalescers.values():
+            coalescer.close()
+
+
+# ==========================================================
+# HTTP transport (localhost JSON)
+# ==========================================================
+class _Handler(BaseHTTPRequestHandler):
+    """
+    GET  /health            → {"status": "ok", "strategies": [...]}
+    GET  /stats             → AnnotationService.report()
+    POST /annotate/sentences  {"sentences": [...], "strategy": name}
+    POST /annotate/pdf        {"pdf": path, "output": path, "strategy": name,
+                               "geometry": bool, "section_filter": bool, "save_mode": mode}
+    A full queue answers 503 with Retry-After; clients back off and resend.
+    """
+
+    server_version = "AutoPaperAnnotator"
+    service: AnnotationService = None
+
+    def _reply(self, status: int, payload: Dict, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._reply(200, {"status": "ok", "strategies": list(self.service.coalescers)})
+        elif self.path == "/stats":
+            self._reply(200, self.service.report())
+        else:
+            self._reply(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        routes = {
+            "/annotate/sentences": lambda job: {"results": self.service.annotate_sentences(
+                job.get("sentences"), job.get("strategy"))},
+            "/annotate/pdf": lambda job: self.service.annotate_pdf(
+                job["pdf"], job.get("output"), job.get("strategy"),
+                bool(job.get("geometry")), bool(job.get("section_filter")), job.get("save_mode", "full")),
+        }
+        route = routes.get(self.path)
+        if route is None:
+            self._reply(404, {"error": f"Unknown path {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            job = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(job, dict):
+                raise ValueError("Request body must be a JSON object.")
+            self._reply(200, route(job))
+        except ServerBusy as e:
+            self._reply(503, {"error": str(e)}, {"Retry-After": "1"})
+        except FileNotFoundError as e:
+            self._reply(404, {"error": str(e)})
+        except (KeyError, ValueError) as e:
+            self._reply(400, {"error": f"Bad request: {e}"})
+        except Exception as e:
+            print(f"[ERROR] Job failed: {e}")
+            self._reply(500, {"error": str(e)})
+
+    def log_message(self, format, *args):
+        pass   # per-request lines would drown the [INFO] output; see /stats
+
+
+def make_server(service: AnnotationService, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    """HTTP server with one thread per request; call `serve_forever()` on it."""
+    handler = type("AnnotationHandler", (_Handler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
@@ -0,0 +1,133 @@
+import json
+import re
+from typing import Any, Dict, List, Tuple
+
+# ==========================================================
+# Incremental parsing of streamed LLM output
+# ==========================================================
+class JSONArrayStreamParser:
+    """
+    Consumes model output piece by piece and returns each element of the
+    first top-level JSON array of objects as soon as its closing brace
+    arrives. Text before the array (chatter, code fences) is skipped.
+
+    `done` turns True once the array closes, so generation can stop there
+    instead of running on to EOS or max_length.
+    """
+
+    def __init__(self):
+        self.items: List[Any] = []
+        self.errors = 0          # elements that were not valid JSON
+        self.done = False
+        self._started = False    # inside the array
+        self._bracket_seen = False   # saw '[' and waiting for '{'
+        self._depth = 0          # nesting inside the current element
+        self._in_string = False
+        self._escape = False
+        self._buf: List[str] = []
+
+    def feed(self, text: str) -> List[Any]:
+        """Adds output text; returns the elements completed by it."""
+        completed = []
+        for ch in text:
+            if self.done:
+                break
+            if not self._started:
+                self._scan_for_start(ch)
+                continue
+
+            if self._depth == 0:
+                # Between elements: only '{' opens one, ']' closes the array
+                if ch == "{":
+                    self._depth = 1
+                    self._buf = [ch]
+                elif ch == "]":
+                    self.done = True
+                continue
+
+            self._buf.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    item = self._finish_item()
+                    if item is not None:
+                        completed.append(item)
+        return completed
+
+    def close(self) -> List[Any]:
+        """End of output: an unfinished element is never valid, so nothing completes."""
+        return []
+
+    def _scan_for_start(self, ch: str):
+        if ch == "[":
+            self._bracket_seen = True
+        elif self._bracket_seen and ch == "{":
+            self._started = True
+            self._depth = 1
+            self._buf = [ch]
+        elif self._bracket_seen and not ch.isspace():
+            self._bracket_seen = False
+
+    def _finish_item(self) -> Any:
+        raw = "".join(self._buf)
+        self._buf = []
+        try:
+            item = json.loads(raw)
+        except json.JSONDecodeError:
+            self.errors += 1
+            return None
+        self.items.append(item)
+        return item
+
+
+class LabelCodeStreamParser:
+    """
+    Incremental parser for the compact "1:M 2:R 3:N" answer format.
+    `feed` returns the (number, code) pairs completed by the new text;
+    `items` maps sentence number → upper-cased code.
+
+    A code is a single letter, so "1: related work" is not read as "1:R"
+    and the sentence goes to the retry path. A letter at the very end of
+    the text so far is only accepted once the next piece shows it is not
+    the start of a word, or by `close` at the end of the output.
+    """
+
+    _PAIR = re.compile(r"(\d+)\s*[:=]\s*([A-Za-z])(?![A-Za-z])")
+
+    def __init__(self):
+        self.items: Dict[int, str] = {}
+        self.done = False   # the format has no terminator; callers stop on count
+        self._buf = ""
+
+    def feed(self, text: str) -> List[Tuple[int, str]]:
+        self._buf += text
+        return self._scan(final=False)
+
+    def close(self) -> List[Tuple[int, str]]:
+        """End of output: completes a pair written right before it."""
+        return self._scan(final=True)
+
+    def _scan(self, final: bool) -> List[Tuple[int, str]]:
+        completed = []
+        consumed = 0
+        for match in self._PAIR.finditer(self._buf):
+            if match.end() == len(self._buf) and not final:
+                break   # "1:R" may still become "1:Related"
+            number, code = int(match.group(1)), match.group(2).upper()
+            self.items[number] = code
+            completed.append((number, code))
+            consumed = match.end()
+        # Keep only the unmatched tail, which may hold a half-written pair
+        self._buf = self._buf[consumed:][-32:]
+        return completed
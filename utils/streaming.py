@@ -0,0 +1,70 @@
+import time
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import fitz  # PyMuPDF
+
+from annotators.base import AnnotatorStrategy
+from utils.corpus import classify_document
+from utils.highlighting import HighlightWriter, _replace_previous
+from utils.instrumentation import TRACER
+from utils.pdf_extract import _section_filter, iter_page_sentences
+
+# ==========================================================
+# Streaming pipeline: pages → batches → highlights
+# ==========================================================
+def batched(items: Iterable, size: int) -> Iterator[List]:
+    """Consecutive lists of at most `size` items, pulled lazily."""
+    it = iter(items)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def annotate_streaming(pdf_path: Path, output_path: Path, strategy: AnnotatorStrategy,
+                       batch_size: int = 16, section_filter: bool = False,
+                       save_mode: str = "full") -> Iterator[Tuple[int, str, Dict]]:
+    """
+    Extracts, classifies and highlights in one pass over a single open
+    document, yielding (page_idx, sentence, result) as each batch is
+    written. Only the current page's sentences and one batch are held in
+    memory; the annotated PDF is saved once the generator is exhausted.
+
+    Batches may span pages. Highlights are placed by searching the page
+    text (no geometry extraction), and LLM batches are fixed-size rather
+    than token-budget packed, since the full sentence list is never built.
+    `section_filter` reads a sample of pages before the first page is
+    streamed, then decides page by page (see `utils.section_filter`).
+    `save_mode` is passed to `HighlightWriter.save`; an incremental save
+    replaces the highlights of an earlier run.
+    """
+    doc = fitz.open(pdf_path)
+    try:
+        writer = HighlightWriter(doc)
+        if save_mode == "incremental":
+            _replace_previous(writer)
+        flt = _section_filter(doc) if section_filter else None
+        batches = batched(iter_page_sentences(doc, flt), max(1, batch_size))
+        while True:
+            # Pages are read lazily, so extraction is timed batch by batch
+            # (recorded for non-empty batches only, like the other stages)
+            start, cpu = time.perf_counter(), time.process_time()
+            batch = next(batches, [])
+            if not batch:
+                break
+            TRACER.add("extract", time.perf_counter() - start, start=start,
+                       cpu_s=time.process_time() - cpu, sentences=len(batch))
+            results = classify_document(strategy, [sentence for _, sentence in batch], len(batch))
+            with TRACER.stage("highlight.annotate", sentences=len(batch)):
+                for (page_idx, sentence), result in zip(batch, results):
+                    writer.add(page_idx, sentence, result)
+            yield from ((page_idx, sentence, result) for (page_idx, sentence), result in zip(batch, results))
+        writer.save(output_path, save_mode)
+        print(f"[INFO] {writer.report()}")
+        if flt is not None:
+            print(f"[INFO] {flt.report()}")
+    finally:
+        doc.close()